@@ -13,6 +13,26 @@ question on Piazza.
 from consts import *
 from game2d import *
 from wave import *
+from replay import Recorder, Replay
+from governor import Governor, GOVERNOR_LEVELS
+from states import HANDLERS
+import os
+import savestate
+import struct
+
+# The number of frames between refreshes of the performance overlay
+PERF_REFRESH = 30
+
+# The most simulation ticks run in one frame; time beyond that is dropped
+MAX_TICKS = 5
+
+# The file the replay of the last wave is saved to when it ends (None to not
+# save replays)
+REPLAY_FILE = 'lastwave.replay'
+
+# The file a game in progress is saved to when the application closes, and
+# picked up from when it starts again (None to not save games)
+SAVE_FILE = 'savegame.sav'
 
 
 # PRIMARY RULE: Invaders can only access attributes in wave.py via getters/
@@ -53,7 +73,8 @@ class Invaders(GameApp):
         _state: the current state of the game represented as a value from
                 consts.py
                 [one of STATE_INACTIVE, STATE_NEWWAVE, STATE_ACTIVE,
-                STATE_PAUSED, STATE_CONTINUE, STATE_COMPLETE]
+                STATE_PAUSED, STATE_CONTINUE, STATE_COMPLETE, STATE_WIN,
+                STATE_LOSE]
         _wave:  the subcontroller for a single wave, which manages the ships and
                 aliens
                 [Wave, or None if there is no wave currently active]
@@ -72,8 +93,73 @@ class Invaders(GameApp):
     to be documented here.
 
     LIST MORE ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY
+        _handler:   the handler of _state, from the table HANDLERS in
+                    states.py [State]
+        _recorder:  the keys given to _wave in each tick so far [Recorder, or
+                    None if _wave is None or was loaded from SAVE_FILE]
+        _clock:     the time not yet simulated, in seconds [0 <= float < TICK
+                    after each frame]
+        _labels:    the labels made so far, by name, so they can be reused
+                    from frame to frame [dict from str to GLabel]
+        _perfon:    True if the performance overlay is shown [bool]
+        _perfkey:   True if the overlay key was down in the last frame [bool]
+        _perftext:  the performance overlay [GLabel, or None if it is not
+                    shown or not made yet]
+        _perfcount: the number of frames since _perftext was made
+                    [int >= 0]
+        _governor:  decides how much drawing to leave out when frames take
+                    too long [Governor]
+        _frame:     the number of frames so far [int >= 0]
+        _updated:   True if _wave was updated in the current frame [bool]
+        _updates:   the number of frames in which _wave was updated [int >= 0]
     """
 
+    def getwave(self):
+        """
+        Returns self._wave
+        """
+        return self._wave
+
+    def gettext(self):
+        """
+        Returns self._text
+        """
+        return self._text
+
+    def settext(self, value):
+        """
+        Sets self._text to value
+
+        Parameter value: the value self._text is set to
+        Precondition: value is a GLabel or None
+        """
+        self._text = value
+
+    def setclock(self, value):
+        """
+        Sets self._clock to value
+
+        Parameter value: the value self._clock is set to
+        Precondition: value is a number (int or float), 0 <= value < TICK
+        """
+        self._clock = value
+
+    def setstate(self, value):
+        """
+        Changes the state of the game to value
+
+        The exit method of the handler of the old state is called first, and
+        then the enter method of the handler of the new one (see states.py).
+
+        Parameter value: the new state
+        Precondition: value is a STATE constant in consts.py with a handler in
+        HANDLERS
+        """
+        self._handler.exit(self)
+        self._state = value
+        self._handler = HANDLERS[value]
+        self._handler.enter(self)
+
     def start(self):
         """
         Initializes the application.
@@ -86,17 +172,87 @@ class Invaders(GameApp):
         This method should make sure that all of the attributes satisfy the
         given invariants. When done, it sets the _state to STATE_INACTIVE and
         create a message (in attribute _text) saying that the user should press
-        to play a game.
+        to play a game (see the handler of STATE_INACTIVE in states.py).
+
+        If a game was saved to SAVE_FILE when the application last closed, it
+        is loaded instead, in STATE_PAUSED (see loadgame).
         """
         # IMPLEMENT ME
         self._wave = None
         self._state = STATE_INACTIVE
         self._text = None
+        self._recorder = None
+        self._clock = 0
+        self._labels = {}
+        self._perfon = False
+        self._perfkey = False
+        self._perftext = None
+        self._perfcount = 0
+        self._governor = Governor()
+        self._frame = 0
+        self._updated = False
+        self._updates = 0
+        self._handler = HANDLERS[STATE_INACTIVE]
+        self._handler.enter(self)
+
+        if SAVE_FILE is not None and os.path.exists(SAVE_FILE):
+            self.loadgame(SAVE_FILE)
+
+    def on_stop(self):
+        """
+        Saves the game in progress to SAVE_FILE when the application closes.
+
+        Only a game in STATE_ACTIVE or STATE_PAUSED is saved. Otherwise any old
+        save is removed, so that the next start begins a new game.
+        """
+        if SAVE_FILE is None:
+            return
+        try:
+            if self._state in (STATE_ACTIVE, STATE_PAUSED):
+                self.savegame(SAVE_FILE)
+            elif os.path.exists(SAVE_FILE):
+                os.remove(SAVE_FILE)
+        except OSError:
+            pass
+
+    def savegame(self, path):
+        """
+        Writes the state of the game and of _wave to the file path, using the
+        format in savestate.py.
+
+        Parameter path: the name of the file to write
+        Precondition: path is a str
+        """
+        wavestate = None if self._wave is None else self._wave.getstate()
+        savestate.save(path, self._state, wavestate)
+
+    def loadgame(self, path):
+        """
+        Reads a game saved by savegame from the file path and carries on with
+        it.
 
-        text = GLabel(text='Press S to Play', font_size = 90, right=680,
-        top=550)
-        if self._state == STATE_INACTIVE:
-            self._text = text
+        The game always comes back in STATE_PAUSED, so the player has to press
+        S to carry on. A ship that was alive when the game was saved stays
+        where it was (see ContinueState in states.py). The keys of a loaded
+        wave are not recorded, because its replay could not be played from the
+        start. A file that cannot be read is ignored.
+
+        Parameter path: the name of the file to read
+        Precondition: path is a str
+        """
+        try:
+            state, wavestate = savestate.load(path)
+        except (OSError, ValueError, struct.error):
+            return
+        if wavestate is None:
+            return
+        formation = wavestate['formation']
+        self._wave = Wave(rows=formation['rows'], cols=formation['cols'],
+        seed=wavestate['seed'], alienspeed=wavestate['alienspeed'],
+        boltrate=wavestate['boltrate'], speedcurve=wavestate['speedcurve'])
+        self._wave.setstate(wavestate)
+        self._recorder = None
+        self.setstate(STATE_PAUSED)
 
     def update(self,dt):
         """
@@ -139,7 +295,8 @@ class Invaders(GameApp):
         animation frame before switching to STATE_ACTIVE.
 
         You are allowed to add more states if you wish. Should you do so, you
-        should describe them here.
+        should describe them here, and add a handler for them to the table
+        HANDLERS in states.py.
 
         STATE_COMPLETE: The game is over. The player
         may press a key to start another game
@@ -153,33 +310,30 @@ class Invaders(GameApp):
         defense line. The player may then press a key to switch to
         STATE_COMPLETE
 
+        Each state is handled by an object in the table HANDLERS in states.py.
+        The handler of the current state is kept in _handler, so each frame
+        only calls its update method, no matter how many states there are. The
+        state is only ever changed with setstate, which calls the exit method
+        of the old handler and the enter method of the new one; that is where
+        the labels are shown, the new wave is made and the ship is brought
+        back, once per change rather than every frame.
+
+        Pressing P in any state turns the performance overlay on or off (see
+        perfupdate).
+
+        The time since the last frame, dt, is given to _governor, which
+        decides how much of the drawing to leave out when frames take too long
+        (see governor.py). The wave is always updated in full, so the game
+        never slows down.
+
         Parameter dt: The time in seconds since last update
         Precondition: dt is a number (int or float)
         """
-        key = self.input.is_key_down('s')
-        if key is True and self._state == STATE_INACTIVE:
-            self._state = STATE_NEWWAVE
-
-        elif self._state == STATE_NEWWAVE:
-            self._wave = Wave()
-            self._state = STATE_ACTIVE
-
-        elif self._state == STATE_ACTIVE:
-            self.activestate(dt)
-        elif self._state == STATE_COMPLETE:
-            self.completestate(dt)
-        elif self._state == STATE_WIN:
-            self.winstate(dt)
-        elif self._state == STATE_LOSE:
-            self.losestate(dt)
-
-        pausetext =  GLabel(text='Press S to Contine' , font_size = 90,
-        x=GAME_WIDTH/2, top=550)
-        if self._state == STATE_PAUSED:
-            self._text = pausetext
-            if key is True:
-                self._wave.newship()
-                self._state = STATE_ACTIVE
+        self._governor.record(dt)
+        self._frame += 1
+        self._updated = False
+        self.perfupdate(dt)
+        self._handler.update(self, dt)
 
     def draw(self):
         """
@@ -194,100 +348,198 @@ class Invaders(GameApp):
         getters for these attributes or you need to add a draw method to class
         Wave.  We suggest the latter.  See the example subcontroller.py from
         class.
+
+        What is drawn depends on the state, and is left to the draw method of
+        _handler.
         """
         # IMPLEMENT ME
-        if self._state == STATE_INACTIVE and self._text is not None:
-            self._text.draw(self.view)
-        elif self._state == STATE_PAUSED and self._text is not None:
-            self._text.draw(self.view)
-        elif self._state == STATE_LOSE and self._text is not None:
-            self._text.draw(self.view)
-        elif self._state == STATE_WIN and self._text is not None:
-            self._text.draw(self.view)
-        elif self._state == STATE_COMPLETE and self._text is not None:
-            self._text.draw(self.view)
-        elif self._state == STATE_ACTIVE:
-            self._text.draw(self.view)
-            self._wave.draw(self.view)
+        self._handler.draw(self)
 
-    def activestate(self, dt):
-        """
-        Handles the game while it is in STATE_ACTIVE. It calls the
-        update() function from Wave to make the game work. It also keeps track
-        of the winning and losing conditions and switches the state to STATE_WIN
-        or STATE_LOSE if an appropriate condition is met. Finally, this function
-        keeps track of player lives
+        if self._perfon and self._perftext is not None:
+            self._perftext.draw(self.view)
 
-        Parameter dt: The time in seconds since last update
-        Precondition: dt is a number (int or float)
+    def newwave(self):
+        """
+        Makes a new wave, and starts recording the keys given to it.
         """
+        self._wave = Wave()
+        self._recorder = Recorder(self.input)
 
-        if self._wave is not None:
-            activetext = GLabel(text='Score:'+str(self._wave.getscore())+
-            '                                                            Lives:'
-            +str(self._wave.getlives()),font_size = 25, left=10,
-            top=GAME_HEIGHT-10)
+    def showscore(self):
+        """
+        Shows the score and lives of the current wave as the message.
+        """
+        self._text = self.getlabel('active',
+        'Score:'+str(self._wave.getscore())+
+        '                                                            Lives:'
+        +str(self._wave.getlives()),font_size = 25, left=10,
+        top=GAME_HEIGHT-10)
 
-        self._wave.update(self.input, dt)
-        self._text = activetext
-        if (self._wave.getship() is None) and (self._wave.getlives() >= 1):
-            self._state = STATE_PAUSED
-            self._wave.setlives(self._wave.getlives() - 1)
-        if (self._wave.getship() is None) and (self._wave.getlives() == 0):
-                self._state = STATE_LOSE
-        if self._wave.getaliensbelow() == True:
-                self._state = STATE_LOSE
-        if self._wave.getaliensleft() == False:
-            self._state = STATE_WIN
+    def drawwave(self):
+        """
+        Draws the current wave to the view.
 
-    def losestate(self, dt):
+        How much of the wave is drawn again depends on the level of _governor
+        (see governor.py).
         """
-        Handles the game while it is in STATE_LOSE. The player is shown a
-        message and can press a key to switch to STATE_COMPLETE
+        governor = self._governor
+        alpha = self._clock/TICK if governor.interpolate() else 1
+        self._wave.draw(self.view, alpha,
+        governor.drawframe(self._updated, self._updates))
 
-        Parameter dt: The time in seconds since last update
-        Precondition: dt is a number (int or float)
+    def getlabel(self, name, text, **keywords):
         """
+        Returns the label called name, showing text.
+
+        The first time a name is asked for, a new GLabel is made with the given
+        text and keywords, and it is kept in _labels. After that the same label
+        is returned every time. If the text has changed, the label's text is
+        set again and the keywords are applied again (so that a label placed
+        by its edges stays in place); otherwise the label is not touched at
+        all, so nothing has to be laid out or uploaded again.
 
-        losetext = GLabel(text="""Better Luck Next Time!
-        Press S to Play Again""", font_size = 50, x=GAME_WIDTH/2, top=550)
+        Parameter name: the name the label is kept under
+        Precondition: name is a str
 
-        key = self.input.is_key_down('s')
-        self._text = losetext
-        if key is True:
-            self._state = STATE_COMPLETE
+        Parameter text: the text the label should show
+        Precondition: text is a str
 
-    def winstate(self, dt):
+        Parameter keywords: the other attributes of the label (such as
+        font_size and top)
+        Precondition: keywords are valid GLabel keywords
         """
-        Handles the game while it is in STATE_WIN. The player is shown a
-        message and can press a key to switch to STATE_COMPLETE
+        label = self._labels.get(name)
+        if label is None:
+            label = GLabel(text=text, **keywords)
+            self._labels[name] = label
+        elif label.text != text:
+            label.text = text
+            for key in keywords:
+                setattr(label, key, keywords[key])
+        return label
+
+    def perfupdate(self, dt):
+        """
+        Handles the performance overlay.
+
+        Pressing P turns the overlay on or off, and with it the profiler of the
+        current wave. While it is on, the overlay shows the frame time, the
+        mean time spent in each phase of Wave.update, how many aliens and
+        bolts there are, and how big the bolt buffer has grown (see
+        BoltBuffer.getstats). The text is only laid out again every PERF_REFRESH
+        frames, so the overlay costs little to keep up.
 
         Parameter dt: The time in seconds since last update
         Precondition: dt is a number (int or float)
         """
+        key = self.input.is_key_down('p')
+        if key and not self._perfkey:
+            self._perfon = not self._perfon
+            self._perftext = None
+        self._perfkey = key
+
+        if self._wave is None:
+            return
+        if self._wave.getprofiler().isenabled() != self._perfon:
+            self._wave.setprofiling(self._perfon)
+        if not self._perfon:
+            return
+
+        self._perfcount += 1
+        if self._perftext is None or (self._perfcount >= PERF_REFRESH and
+            self._governor.hudframe(self._frame)):
+            profiler = self._wave.getprofiler()
+            times = profiler.getaverages()
+            counts = self._wave.getobjectcounts()
+            lines = ['frame %.1f ms  update %.3f ms (worst %.3f)' %
+            (1000*dt, times.pop('frame'), profiler.getworst())]
+            for phase in times:
+                lines.append('%s %.3f ms' % (phase, times[phase]))
+            bolts = self._wave.getboltstats()
+            lines.append('aliens %d  bolts %d of %d (most %d, grown %d)' %
+            (counts['aliens'], counts['bolts'], bolts['capacity'],
+            bolts['highwater'], bolts['grows']))
+            governor = self._governor
+            stats = governor.getstats()
+            lines.append('governor %s  %.2f ms of %.2f ms' %
+            (GOVERNOR_LEVELS[governor.getlevel()], 1000*governor.getmean(),
+            1000*governor.getbudget()))
+            lines.append('  '.join('%s %d' % (name, stats[name][0])
+            for name in GOVERNOR_LEVELS))
+            self._perftext = self.getlabel('perf', '\n'.join(lines),
+            font_size=12, left=10, bottom=10, halign='left')
+            self._perfcount = 0
 
-        wintext = GLabel(text="""Congratulations You Win!
-        Press S to Play Again""", font_size = 50, x=GAME_WIDTH/2, top=550)
-
-        key = self.input.is_key_down('s')
-        if self._state == STATE_WIN:
-            self._text = wintext
-            if key is True:
-                self._state = STATE_COMPLETE
-
-    def completestate(self, dt):
+    def activestate(self, dt):
         """
-        Handles the game while it is in STATE_COMPLETE. The player is shown a
-        message and can press a key to begin a new game.
+        Handles the game while it is in STATE_ACTIVE. It calls the
+        update() function from Wave to make the game work. It also keeps track
+        of the winning and losing conditions and switches the state to STATE_WIN
+        or STATE_LOSE if an appropriate condition is met, or to STATE_PAUSED
+        when a life is lost. Finally, this function keeps track of player lives
+
+        The wave is always updated in fixed ticks of TICK seconds, no matter how
+        long the frame was, so the game plays at the same speed at any frame
+        rate. The frame time is added to _clock and as many whole ticks as fit
+        are run (at most MAX_TICKS, so a slow frame cannot snowball). What is
+        left over in _clock is used by draw to place the moving objects
+        between ticks. The keys given to each tick are recorded by _recorder,
+        and saved to REPLAY_FILE when the wave is won or lost (by the handlers
+        of STATE_WIN and STATE_LOSE).
 
         Parameter dt: The time in seconds since last update
         Precondition: dt is a number (int or float)
         """
+        if self._governor.hudframe(self._frame):
+            self.showscore()
+
+        self._clock += dt
+        ticks = 0
+        state = STATE_ACTIVE
+        while self._clock >= TICK and state == STATE_ACTIVE:
+            if self._recorder is not None:
+                self._recorder.tick()
+                self._wave.update(self._recorder, TICK)
+            else:
+                self._wave.update(self.input, TICK)
+            self._clock -= TICK
+            ticks += 1
+            if ticks == MAX_TICKS:
+                self._clock = 0
+
+            if (self._wave.getship() is None) and (self._wave.getlives() >= 1):
+                state = STATE_PAUSED
+                self._wave.setlives(self._wave.getlives() - 1)
+            if (self._wave.getship() is None) and (self._wave.getlives() == 0):
+                    state = STATE_LOSE
+            if self._wave.getaliensbelow() == True:
+                    state = STATE_LOSE
+            if self._wave.getaliensleft() == False:
+                state = STATE_WIN
+
+        if ticks > 0:
+            self._updated = True
+            self._updates += 1
+
+        if state != STATE_ACTIVE:
+            self.setstate(state)
+
+    def savereplay(self):
+        """
+        Saves the replay of the current wave to REPLAY_FILE.
 
-        completetext = GLabel(text='Press S to Play Again' , font_size = 90,
-        right=680, top=550)
-
-        key = self.input.is_key_down('s')
-        self._text = completetext
-        if key is True:
-            self._state = STATE_NEWWAVE
+        Nothing is saved if REPLAY_FILE is None or the wave was loaded from a
+        save. A replay that cannot be written is skipped rather than stopping
+        the game.
+        """
+        if REPLAY_FILE is None or self._recorder is None:
+            return
+        wave = self._wave
+        formation = wave.getformation()
+        replay = Replay(wave.getseed(), self._recorder.getkeys(),
+        formation.getrows(), formation.getcols(), wave.getalienspeed(),
+        wave.getboltrate(), wave.getspeedcurve())
+        try:
+            replay.save(REPLAY_FILE)
+        except OSError:
+            pass
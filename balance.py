@@ -0,0 +1,393 @@
+"""
+Balancing module for Alien Invaders
+
+This module plays many headless waves at once to see how hard the game is.
+Every combination of the alien speed, the bolt rate and the speed curve named
+on the command line is played with a number of seeds and bots, spread across
+all of the CPU cores with a process pool.  Each wave is written to a results
+file as one line of JSON as soon as it is done, so a large sweep never keeps
+more than a summary of each combination in memory.  At the end, the win rate,
+the time taken to clear the wave, the lives lost and the spread of scores are
+printed for each combination.
+
+Run it from the command line, for example:
+
+    python balance.py --runs 200 --alienspeed 1.0 0.8 --boltrate 5 3
+
+See python balance.py --help for the other options.  An old results file can be
+summarized again with --summarize FILE.
+"""
+from consts import *
+from headless import ScriptedInput
+from replay import playwave
+from wave import Wave, TICK, SPEED_CURVE
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+
+# The most ticks a wave is played for (ten minutes of play)
+BALANCE_TICKS = 36000
+
+# The keys held down by the sweep bot: back and forth, always firing
+SWEEP_SCRIPT = ([('left', 'spacebar')]*40 + [('right', 'spacebar')]*80 +
+                [('left', 'spacebar')]*40)
+
+# The percentiles of the score printed in the summary
+SCORE_PERCENTILES = (10, 50, 90)
+
+
+class TrackerBot(object):
+    """
+    A class to stand in for GInput, playing a wave like a simple player.
+
+    Each tick the bot picks the column of live aliens closest to the ship,
+    moves under its lowest alien and fires.  If an alien bolt is falling on the
+    ship, it steps out of the way instead.
+
+    INSTANCE ATTRIBUTES:
+        _wave: the wave being played [Wave]
+        _keys: the keys held down in the current tick [set of str]
+    """
+
+    def __init__(self, wave):
+        """
+        Initializes a new TrackerBot playing wave.
+
+        Parameter wave: the wave to play
+        Precondition: wave is a Wave
+        """
+        self._wave = wave
+        self._keys = set()
+        self.advance()
+
+    def is_key_down(self, key):
+        """
+        Returns True if key is held down in the current tick, False otherwise
+
+        Parameter key: the name of the key
+        Precondition: key is a str
+        """
+        return key in self._keys
+
+    def advance(self):
+        """
+        Picks the keys held down in the next tick.
+        """
+        self._keys.clear()
+        ship = self._wave.getship()
+        if ship is None:
+            return
+        x = ship.getx()
+
+        bolts = self._wave.getbolts()
+        xs = bolts.getx().tolist()
+        ys = bolts.gety().tolist()
+        owners = bolts.getfromship().tolist()
+        for i in range(len(xs)):
+            if (not owners[i] and abs(xs[i] - x) < SHIP_WIDTH and
+                ys[i] < SHIP_BOTTOM + SHIP_HEIGHT + 6*BOLT_HEIGHT):
+                if xs[i] > x and ship.left > 0 or ship.right >= GAME_WIDTH:
+                    self._keys.add('left')
+                else:
+                    self._keys.add('right')
+                return
+
+        formation = self._wave.getformation()
+        target = None
+        for col in formation.columns():
+            colx = formation.getposition(formation.lowest(col), col)[0]
+            if target is None or abs(colx - x) < abs(target - x):
+                target = colx
+        if target is not None:
+            if target < x - SHIP_MOVEMENT:
+                self._keys.add('left')
+            elif target > x + SHIP_MOVEMENT:
+                self._keys.add('right')
+        self._keys.add('spacebar')
+
+
+def makebot(name, wave):
+    """
+    Returns a new bot called name to play wave
+
+    Parameter name: the name of the bot
+    Precondition: name is a key of BOTS
+
+    Parameter wave: the wave to play
+    Precondition: wave is a Wave
+    """
+    return BOTS[name](wave)
+
+
+# The bots that can play a wave, each a function from a Wave to an input
+BOTS = {
+    'sweep':   lambda wave: ScriptedInput(SWEEP_SCRIPT, loop=True),
+    'tracker': TrackerBot,
+}
+
+
+def runone(job):
+    """
+    Plays one headless wave and returns how it went as a dictionary.
+
+    The dictionary has the settings in job plus 'won' (True if every alien was
+    shot), 'ticks' (the ticks played), 'seconds' (the time that works out to),
+    'liveslost' and 'score'.  A wave that is neither won nor lost after
+    job['ticks'] ticks counts as lost.
+
+    This is the function run by each process of the pool, so it is at the top
+    of the module and takes a single argument.
+
+    Parameter job: the settings of the wave, with the keys 'alienspeed',
+    'boltrate', 'speedcurve', 'bot', 'seed' and 'ticks'
+    Precondition: job is a dictionary returned by function jobs
+    """
+    wave = Wave(headless=True, seed=job['seed'],
+    alienspeed=job['alienspeed'], boltrate=job['boltrate'],
+    speedcurve=job['speedcurve'])
+    ticks = playwave(wave, makebot(job['bot'], wave), job['ticks'])
+    result = dict(job)
+    result['ticks'] = ticks
+    result['won'] = not wave.getaliensleft() and not wave.getaliensbelow()
+    result['seconds'] = ticks*TICK
+    result['liveslost'] = SHIP_LIVES - wave.getlives()
+    result['score'] = wave.getscore()
+    return result
+
+
+def jobs(alienspeeds, boltrates, speedcurves, bots, runs, seed=0,
+    ticks=BALANCE_TICKS):
+    """
+    Yields the settings of every wave in a sweep, one dictionary at a time.
+
+    Every combination of the given settings is played runs times, with the
+    seeds seed, seed+1, ..., seed+runs-1.  The same seeds are used for every
+    combination, so that they are compared on the same games.
+
+    Parameter alienspeeds: the seconds between alien steps to try
+    Precondition: alienspeeds is a sequence of numbers > 0
+
+    Parameter boltrates: the most alien steps between bolts to try
+    Precondition: boltrates is a sequence of ints > 0
+
+    Parameter speedcurves: the speed curves to try
+    Precondition: speedcurves is a sequence of numbers, 0 < each <= 1
+
+    Parameter bots: the bots to play with
+    Precondition: bots is a sequence of keys of BOTS
+
+    Parameter runs: the number of seeds to play each combination with
+    Precondition: runs is an int > 0
+
+    Parameter seed: the first seed
+    Precondition: seed is an int >= 0
+
+    Parameter ticks: the most ticks each wave is played for
+    Precondition: ticks is an int > 0
+    """
+    for alienspeed, boltrate, speedcurve, bot in itertools.product(
+        alienspeeds, boltrates, speedcurves, bots):
+        for i in range(runs):
+            yield {'alienspeed': alienspeed, 'boltrate': boltrate,
+                   'speedcurve': speedcurve, 'bot': bot, 'seed': seed + i,
+                   'ticks': ticks}
+
+
+def keyof(result):
+    """
+    Returns the combination of settings result was played with, as a tuple
+    (alienspeed, boltrate, speedcurve, bot)
+
+    Parameter result: the outcome of a wave
+    Precondition: result is a dictionary returned by runone
+    """
+    return (result['alienspeed'], result['boltrate'], result['speedcurve'],
+            result['bot'])
+
+
+class Summary(object):
+    """
+    A class to add up the outcomes of the waves played with one combination of
+    settings.
+
+    Only totals are kept, plus a count of each score.  Scores go up by 100 an
+    alien, so there are only as many different scores as there are aliens, and
+    the memory used does not grow with the number of waves.
+
+    INSTANCE ATTRIBUTES:
+        _runs:      the number of waves added [int >= 0]
+        _wins:      the number of those waves that were won [int >= 0]
+        _wintime:   the seconds taken by the waves that were won [float >= 0]
+        _liveslost: the lives lost in all of the waves [int >= 0]
+        _scores:    the number of waves with each score [dict from int to
+                    int > 0]
+    """
+
+    def __init__(self):
+        """
+        Initializes a new, empty Summary.
+        """
+        self._runs = 0
+        self._wins = 0
+        self._wintime = 0.0
+        self._liveslost = 0
+        self._scores = {}
+
+    def add(self, result):
+        """
+        Adds the outcome of one wave to the summary.
+
+        Parameter result: the outcome of a wave
+        Precondition: result is a dictionary returned by runone
+        """
+        self._runs += 1
+        if result['won']:
+            self._wins += 1
+            self._wintime += result['seconds']
+        self._liveslost += result['liveslost']
+        score = result['score']
+        self._scores[score] = self._scores.get(score, 0) + 1
+
+    def percentile(self, p):
+        """
+        Returns the score that p percent of the waves scored at most, or 0 if
+        no waves were added
+
+        Parameter p: the percentile
+        Precondition: p is a number, 0 <= p <= 100
+        """
+        need = p*self._runs/100
+        seen = 0
+        for score in sorted(self._scores):
+            seen += self._scores[score]
+            if seen >= need:
+                return score
+        return 0
+
+    def getstats(self):
+        """
+        Returns the summary as a dictionary
+
+        The keys are 'runs', 'winrate', 'cleartime' (the mean seconds taken by
+        the waves that were won, or None if none were), 'liveslost' (the mean
+        lives lost), and 'p' followed by each of SCORE_PERCENTILES for the
+        score at that percentile.
+        """
+        runs = max(self._runs, 1)
+        stats = {'runs': self._runs, 'winrate': self._wins/runs,
+                 'cleartime': self._wintime/self._wins if self._wins else None,
+                 'liveslost': self._liveslost/runs}
+        for p in SCORE_PERCENTILES:
+            stats['p'+str(p)] = self.percentile(p)
+        return stats
+
+
+def sweep(joblist, output, workers=None, chunksize=8):
+    """
+    Plays every wave in joblist across a pool of processes and returns a
+    dictionary from each combination of settings (see keyof) to its Summary.
+
+    Each outcome is written to the file output as a line of JSON as soon as it
+    comes back, in whatever order the processes finish.
+
+    Parameter joblist: the settings of the waves to play
+    Precondition: joblist is an iterable of dictionaries as yielded by jobs
+
+    Parameter output: the name of the file to write the outcomes to
+    Precondition: output is a str
+
+    Parameter workers: the number of processes, or None for one per CPU core
+    Precondition: workers is None or an int > 0
+
+    Parameter chunksize: the number of waves handed to a process at a time
+    Precondition: chunksize is an int > 0
+    """
+    summaries = {}
+    with open(output, 'w') as file:
+        with multiprocessing.Pool(workers) as pool:
+            for result in pool.imap_unordered(runone, joblist, chunksize):
+                file.write(json.dumps(result)+'\n')
+                file.flush()
+                summaries.setdefault(keyof(result), Summary()).add(result)
+    return summaries
+
+
+def summarize(path):
+    """
+    Reads the outcomes in the file path, one line at a time, and returns a
+    dictionary from each combination of settings to its Summary.
+
+    Parameter path: the name of a file written by sweep
+    Precondition: path is a str
+    """
+    summaries = {}
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                result = json.loads(line)
+                summaries.setdefault(keyof(result), Summary()).add(result)
+    return summaries
+
+
+def report(summaries):
+    """
+    Prints summaries as a table, one row per combination of settings.
+
+    Parameter summaries: the summary of each combination
+    Precondition: summaries is a dictionary returned by sweep or summarize
+    """
+    print('%8s %5s %6s %-8s %6s %7s %9s %6s' % ('speed', 'rate', 'curve',
+          'bot', 'runs', 'win%', 'clear(s)', 'lives') +
+          ''.join(' %6s' % ('p'+str(p)) for p in SCORE_PERCENTILES))
+    for key in sorted(summaries):
+        stats = summaries[key].getstats()
+        cleartime = stats['cleartime']
+        print('%8.3f %5d %6.3f %-8s %6d %6.1f%% %9s %6.2f' % (key[0], key[1],
+              key[2], key[3], stats['runs'], 100*stats['winrate'],
+              '-' if cleartime is None else '%.1f' % cleartime,
+              stats['liveslost']) +
+              ''.join(' %6d' % stats['p'+str(p)] for p in SCORE_PERCENTILES))
+
+
+def main():
+    """
+    Runs the sweep named on the command line and prints its summary.
+    """
+    parser = argparse.ArgumentParser(description='Play many headless waves '
+    'to balance the difficulty of the game.')
+    parser.add_argument('--runs', type=int, default=100,
+    help='seeds to play each combination with')
+    parser.add_argument('--seed', type=int, default=0, help='the first seed')
+    parser.add_argument('--alienspeed', type=float, nargs='+',
+    default=[ALIEN_SPEED], help='seconds between alien steps to try')
+    parser.add_argument('--boltrate', type=int, nargs='+',
+    default=[BOLT_RATE], help='most alien steps between bolts to try')
+    parser.add_argument('--speedcurve', type=float, nargs='+',
+    default=[SPEED_CURVE], help='speed curves to try')
+    parser.add_argument('--bot', nargs='+', default=list(BOTS),
+    help='bots to play with, from '+', '.join(BOTS)+' (default: all)')
+    parser.add_argument('--ticks', type=int, default=BALANCE_TICKS,
+    help='most ticks to play each wave for')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+    help='processes to play with (default: one per CPU core)')
+    parser.add_argument('--output', default='balance_results.jsonl',
+    help='where to write the outcome of each wave')
+    parser.add_argument('--summarize', metavar='FILE',
+    help='only summarize the outcomes in FILE')
+    args = parser.parse_args()
+
+    if args.summarize is not None:
+        report(summarize(args.summarize))
+        return
+    for name in args.bot:
+        if name not in BOTS:
+            parser.error('unknown bot '+repr(name))
+    report(sweep(jobs(args.alienspeed, args.boltrate, args.speedcurve,
+                      args.bot, args.runs, args.seed, args.ticks),
+                 args.output, args.workers))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark module for Alien Invaders
+
+This module measures how long Wave.update takes.  It plays headless waves
+through a few fixed scenarios by calling Wave.update with the profiler of the
+wave switched on, and adds up the time of each phase in profiler.PROFILE_PHASES
+over every frame.  So the benchmark times exactly what the game runs, and the
+phases have the same names as in the performance overlay.  The results are
+printed as a table and also written to a JSON file, so that two runs can be
+compared to catch a slowdown before it reaches players.
+
+Run it from the command line:
+
+    python bench.py [--frames N] [--seed S] [--output FILE] [scenario ...]
+
+With no scenarios named, all of them are run.
+"""
+from consts import *
+from wave import Wave
+from headless import ScriptedInput
+from profiler import PROFILE_PHASES
+import argparse
+import json
+import platform
+
+# The number of frames each scenario is played for
+BENCH_FRAMES = 2000
+
+# The number of alien bolts kept on screen in the bullet storm scenario
+STORM_BOLTS = 200
+
+# The keys held down while benchmarking: sweep left and right, always firing
+BENCH_SCRIPT = ([('left', 'spacebar')]*40 + [('right', 'spacebar')]*80 +
+                [('left', 'spacebar')]*40)
+
+
+def setup_full(wave):
+    """
+    Leaves wave as it is: a full formation of the usual size.
+    """
+    pass
+
+
+def setup_sparse(wave):
+    """
+    Shoots every alien in wave except the two ends of the bottom row, like the
+    end of a game.
+    """
+    formation = wave.getformation()
+    last = formation.getcols()-1
+    for row in range(formation.getrows()):
+        for col in range(formation.getcols()):
+            if row != formation.getrows()-1 or col not in (0, last):
+                formation.kill(row, col)
+
+
+def frame_storm(wave):
+    """
+    Tops the bolts in wave back up to STORM_BOLTS alien bolts, spread evenly
+    across the screen.
+    """
+    bolts = wave.getbolts()
+    i = bolts.count()
+    while bolts.count() < STORM_BOLTS:
+        bolts.add((i*37) % GAME_WIDTH, GAME_HEIGHT - (i*53) % GAME_HEIGHT,
+        False)
+        i += 1
+
+
+# Each scenario is (Wave keywords, setup function, function run before every
+# frame or None)
+SCENARIOS = {
+    'full':   ({}, setup_full, None),
+    'sparse': ({}, setup_sparse, None),
+    'storm':  ({}, setup_full, frame_storm),
+    'large':  ({'rows': 10, 'cols': 15}, setup_full, None),
+}
+
+
+def run(name, frames=BENCH_FRAMES, seed=0, dt=1/60):
+    """
+    Returns the timings of scenario name as a dictionary.
+
+    The dictionary has the total seconds spent in update, the frames per
+    second that works out to, and the mean microseconds per frame spent in each
+    phase of PROFILE_PHASES.  The ship is given back whenever it is destroyed,
+    so every scenario runs for all of its frames.
+
+    Parameter name: the scenario to run
+    Precondition: name is a key of SCENARIOS
+
+    Parameter frames: the number of frames to run
+    Precondition: frames is an int > 0
+
+    Parameter seed: the seed for the random numbers used by the wave
+    Precondition: seed is an int
+
+    Parameter dt: The time in seconds of each frame
+    Precondition: dt is a number (int or float) > 0
+    """
+    keywords, setup, perframe = SCENARIOS[name]
+    wave = Wave(headless=True, seed=seed, **keywords)
+    setup(wave)
+    input = ScriptedInput(BENCH_SCRIPT, loop=True)
+    profiler = wave.getprofiler()
+    wave.setprofiling(True)
+    totals = [0.0]*len(PROFILE_PHASES)
+    total = 0.0
+
+    for frame in range(frames):
+        if perframe is not None:
+            perframe(wave)
+        wave.update(input, dt)
+        times = profiler.getlast()
+        for i in range(len(totals)):
+            totals[i] += times[i]
+        total += profiler.getlasttotal()
+        input.advance()
+        if wave.getship() is None:
+            wave.newship()
+
+    return {'frames': frames, 'seconds': total,
+            'fps': frames/total if total > 0 else float('inf'),
+            'phases': dict((PROFILE_PHASES[i], 1e6*totals[i]/frames)
+                           for i in range(len(totals)))}
+
+
+def report(results):
+    """
+    Prints results as a table, one row per scenario and one column per phase.
+
+    Parameter results: the timings of each scenario
+    Precondition: results is a dictionary from scenario name to the result of
+    function run
+    """
+    names = list(next(iter(results.values()))['phases'])
+    print('%-8s %10s' % ('scenario', 'fps') +
+          ''.join(' %14s' % name for name in names))
+    for scenario, result in results.items():
+        print('%-8s %10.0f' % (scenario, result['fps']) +
+              ''.join(' %12.2fus' % result['phases'][name] for name in names))
+
+
+def main():
+    """
+    Runs the benchmarks named on the command line and saves the results.
+    """
+    parser = argparse.ArgumentParser(description='Time the phases of '
+    'Wave.update in headless scenarios.')
+    parser.add_argument('scenarios', nargs='*',
+    help='the scenarios to run, from '+', '.join(SCENARIOS)+' (default: all)')
+    parser.add_argument('--frames', type=int, default=BENCH_FRAMES,
+    help='frames per scenario')
+    parser.add_argument('--seed', type=int, default=0,
+    help='seed for the random numbers')
+    parser.add_argument('--output', default='bench_results.json',
+    help='where to write the results as JSON')
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error('unknown scenario '+repr(name))
+
+    results = {}
+    for name in args.scenarios or list(SCENARIOS):
+        results[name] = run(name, args.frames, args.seed)
+    report(results)
+
+    with open(args.output, 'w') as file:
+        json.dump({'python': platform.python_version(),
+                   'machine': platform.machine(), 'seed': args.seed,
+                   'scenarios': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
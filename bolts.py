@@ -0,0 +1,306 @@
+"""
+Bolts module for Alien Invaders
+
+This module contains the class BoltBuffer.
+
+BoltBuffer keeps track of the laser bolts on screen.  Instead of a list of Bolt
+objects, it stores the bolts as parallel NumPy arrays (one each for x, y,
+velocity, owner and alive), so that moving every bolt, finding the ones that
+have left the screen and removing them is done in a single pass.
+"""
+from consts import *
+from headless import overlaps
+import numpy
+
+# The number of bolts a new BoltBuffer has room for before it grows
+BOLT_BUFFER_SIZE = 32
+
+
+class BoltBuffer(object):
+    """
+    A class to represent all the laser bolts on screen.
+
+    The live bolts are always the first _count entries of each array, in the
+    order that they were fired.  A bolt that hits something is first marked as
+    not alive with kill, and the arrays are then packed again with compact (or
+    move, which compacts as it goes).  The arrays double in size whenever they
+    run out of room.  They are never made smaller, so once the buffer has grown
+    to the most bolts a game has on screen, firing a bolt never makes anything
+    new.  getstats reports how big the buffer is and how often it has grown.
+
+    INSTANCE ATTRIBUTES:
+        _count:    the number of bolts in the buffer [int >= 0]
+        _x:        the x-coordinate of the center of each bolt [numpy array of
+                   float]
+        _y:        the y-coordinate of the center of each bolt [numpy array of
+                   float]
+        _velocity: the velocity of each bolt in y direction [numpy array of
+                   float]
+        _fromship: True for each bolt fired from the player ship, False for
+                   each bolt fired from an alien [numpy array of bool]
+        _alive:    True for each bolt that has not hit anything [numpy array of
+                   bool]
+        _shipbolts: the number of bolts fired from the player ship [int >= 0]
+        _near:     room for hit to work in [numpy array of bool]
+        _scratch:  more room for hit to work in [numpy array of bool]
+        _highwater: the most bolts that have been in the buffer at once
+                   [int >= 0]
+        _grows:    the number of times the arrays have doubled [int >= 0]
+
+    All of the arrays have the same length, which is at least _count.
+    """
+
+    def count(self):
+        """
+        Returns the number of bolts in the buffer
+        """
+        return self._count
+
+    def getx(self):
+        """
+        Returns the x-coordinates of the bolts in the buffer
+
+        The result is a view of the first _count entries of _x.  It is not
+        copied, so it must not be changed by the caller.
+        """
+        return self._x[:self._count]
+
+    def gety(self):
+        """
+        Returns the y-coordinates of the bolts in the buffer
+
+        The result is a view of the first _count entries of _y.  It is not
+        copied, so it must not be changed by the caller.
+        """
+        return self._y[:self._count]
+
+    def getvelocity(self):
+        """
+        Returns the velocities of the bolts in the buffer
+
+        The result is a view of the first _count entries of _velocity.  It is
+        not copied, so it must not be changed by the caller.
+        """
+        return self._velocity[:self._count]
+
+    def getfromship(self):
+        """
+        Returns the owners of the bolts in the buffer (True for the ship)
+
+        The result is a view of the first _count entries of _fromship.  It is
+        not copied, so it must not be changed by the caller.
+        """
+        return self._fromship[:self._count]
+
+    def getstats(self):
+        """
+        Returns a dictionary of statistics about the buffer
+
+        The keys are 'capacity' (the bolts there is room for), 'highwater' (the
+        most bolts that have been in the buffer at once) and 'grows' (the
+        number of times the arrays have doubled).  A new dictionary is made
+        each time, so it is safe to keep.
+        """
+        return {'capacity': len(self._x), 'highwater': self._highwater,
+                'grows': self._grows}
+
+    def hasshipbolt(self):
+        """
+        Returns True if a bolt fired from the player ship is in the buffer
+        """
+        return self._shipbolts > 0
+
+    def __init__(self, capacity=BOLT_BUFFER_SIZE):
+        """
+        Initializes a new, empty BoltBuffer.
+
+        Parameter capacity: the number of bolts there is room for at first
+        Precondition: capacity is an int > 0
+        """
+        self._count = 0
+        self._shipbolts = 0
+        self._highwater = 0
+        self._grows = 0
+        self._x = numpy.zeros(capacity)
+        self._y = numpy.zeros(capacity)
+        self._velocity = numpy.zeros(capacity)
+        self._fromship = numpy.zeros(capacity, dtype=bool)
+        self._alive = numpy.zeros(capacity, dtype=bool)
+        self._near = numpy.zeros(capacity, dtype=bool)
+        self._scratch = numpy.zeros(capacity, dtype=bool)
+
+    def getstate(self):
+        """
+        Returns the bolts in the buffer as a dictionary
+
+        The dictionary has the keys 'x', 'y', 'velocity' and 'fromship', each
+        a copy of the first count() entries of that array.
+        """
+        n = self._count
+        return {'x': self._x[:n].copy(), 'y': self._y[:n].copy(),
+                'velocity': self._velocity[:n].copy(),
+                'fromship': self._fromship[:n].copy()}
+
+    def setstate(self, state):
+        """
+        Replaces the bolts in the buffer with the bolts in state.
+
+        Parameter state: the bolts to put in the buffer
+        Precondition: state was returned by getstate
+        """
+        n = len(state['x'])
+        while len(self._x) < n:
+            self._grow()
+        self._x[:n] = state['x']
+        self._y[:n] = state['y']
+        self._velocity[:n] = state['velocity']
+        self._fromship[:n] = state['fromship']
+        self._alive[:n] = True
+        self._alive[n:] = False
+        self._count = n
+        self._highwater = max(self._highwater, n)
+        self._shipbolts = int(numpy.count_nonzero(self._fromship[:n]))
+
+    def add(self, x, y, fromship):
+        """
+        Adds a new bolt to the end of the buffer.
+
+        The velocity of the bolt is BOLT_SPEED if it is fired from the ship and
+        -BOLT_SPEED if it is fired from an alien, the same as for Bolt.
+
+        Parameter x: The x-coordinate of the center of the bolt
+        Precondition: x is an int or float
+
+        Parameter y: The y-coordinate of the center of the bolt
+        Precondition: y is an int or float
+
+        Parameter fromship: True if the bolt is fired from a Ship and False if
+                            fired from an alien.
+        Precondition: fromship is a bool
+        """
+        if self._count == len(self._x):
+            self._grow()
+        i = self._count
+        self._x[i] = x
+        self._y[i] = y
+        self._velocity[i] = BOLT_SPEED if fromship else -BOLT_SPEED
+        self._fromship[i] = fromship
+        self._alive[i] = True
+        self._count += 1
+        if self._count > self._highwater:
+            self._highwater = self._count
+        if fromship:
+            self._shipbolts += 1
+
+    def kill(self, i):
+        """
+        Marks bolt i as having hit something.
+
+        The bolt stays in the buffer until the next call to compact or move.
+
+        Parameter i: the index of the bolt
+        Precondition: i is an int, 0 <= i < self.count()
+        """
+        self._alive[i] = False
+
+    def hit(self, left, bottom, right, top, fromship):
+        """
+        Returns the index of the first live bolt with the given owner that
+        overlaps the given box, or None if there is no such bolt.
+
+        All of the bolts are tested at once with the function overlaps.  A
+        bolt overlaps the box when its center is inside the box grown by half a
+        bolt on every side, so the centers are tested against that larger box
+        and no array of edges has to be made.  The work is done in _near and
+        _scratch, so a test does not make any new arrays.
+
+        Parameter left: the left edge of the box
+        Precondition: left is an int or float
+
+        Parameter bottom: the bottom edge of the box
+        Precondition: bottom is an int or float <= top
+
+        Parameter right: the right edge of the box
+        Precondition: right is an int or float >= left
+
+        Parameter top: the top edge of the box
+        Precondition: top is an int or float
+
+        Parameter fromship: the owner of the bolts to test (True for the ship)
+        Precondition: fromship is a bool
+        """
+        n = self._count
+        owned = self._shipbolts if fromship else n - self._shipbolts
+        if owned == 0:
+            return None
+        x = self._x[:n]
+        y = self._y[:n]
+        near = overlaps(left - BOLT_WIDTH/2, bottom - BOLT_HEIGHT/2,
+        right + BOLT_WIDTH/2, top + BOLT_HEIGHT/2, x, y, x, y,
+        self._near[:n], self._scratch[:n])
+        near &= self._alive[:n]
+        if fromship:
+            near &= self._fromship[:n]
+        else:
+            # For bool arrays, a > b is a and not b
+            numpy.greater(near, self._fromship[:n], out=near)
+        i = int(near.argmax())
+        if near[i]:
+            return i
+        return None
+
+    def move(self):
+        """
+        Moves every bolt by its velocity and removes the ones that are off
+        screen or have hit something.
+
+        A bolt is off screen when its bottom is above the top of the screen or
+        its top is below the bottom of the screen.
+        """
+        n = self._count
+        if n == 0:
+            return
+        y = self._y[:n]
+        y += self._velocity[:n]
+        gone = (y > GAME_HEIGHT + BOLT_HEIGHT/2) | (y < -BOLT_HEIGHT/2)
+        if gone.any():
+            self._alive[:n] &= ~gone
+        self.compact()
+
+    def compact(self):
+        """
+        Removes the bolts that have hit something, keeping the others in order.
+        """
+        n = self._count
+        keep = self._alive[:n]
+        if n == 0 or keep.all():
+            return
+        index = numpy.flatnonzero(keep)
+        m = len(index)
+        for array in (self._x, self._y, self._velocity, self._fromship):
+            array[:m] = array[index]
+        self._alive[:m] = True
+        self._alive[m:n] = False
+        self._count = m
+        self._shipbolts = int(numpy.count_nonzero(self._fromship[:m]))
+
+    def clear(self):
+        """
+        Removes every bolt from the buffer.
+        """
+        self._alive[:self._count] = False
+        self._count = 0
+        self._shipbolts = 0
+
+    def _grow(self):
+        """
+        Doubles the length of every array, keeping the bolts in them.
+        """
+        size = 2*len(self._x)
+        for name in ('_x', '_y', '_velocity', '_fromship', '_alive', '_near',
+            '_scratch'):
+            old = getattr(self, name)
+            new = numpy.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self._grows += 1
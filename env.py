@@ -0,0 +1,194 @@
+"""
+Environment module for Alien Invaders
+
+This module contains the class WaveEnv, which lets a bot play a single headless
+Wave one tick at a time with reset and step, in the style of a Gym environment.
+An action is a bitmask of ACTION_LEFT, ACTION_RIGHT and ACTION_FIRE, the same
+as for VecWave, and stands for the keys Wave.shipmove and Wave.shipfire look at.
+
+The observation is a dictionary that is kept for the life of the environment
+and filled in again after every step.  Its arrays are views of the arrays in the
+Formation and BoltBuffer of the wave, not copies, so an observation costs the
+same no matter how many aliens and bolts there are.  For many waves at once, use
+VecWave instead.
+"""
+from consts import *
+from replay import playwave, waveover
+from vecwave import ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE
+from wave import Wave
+
+# The bit of an action that stands for each key
+ACTION_KEYS = {'left': ACTION_LEFT, 'right': ACTION_RIGHT,
+               'spacebar': ACTION_FIRE}
+
+
+class ActionInput(object):
+    """
+    A class to stand in for GInput, holding down the keys of an action.
+
+    The action stays the same until it is set again, so advance does nothing.
+
+    INSTANCE ATTRIBUTES:
+        _action: the keys held down [int, a bitmask of ACTION_LEFT, ACTION_RIGHT
+                 and ACTION_FIRE]
+    """
+
+    def getaction(self):
+        """
+        Returns self._action
+        """
+        return self._action
+
+    def setaction(self, value):
+        """
+        Sets self._action to value
+
+        Parameter value: the value self._action is set to
+        Precondition: value is an int, a bitmask of ACTION_LEFT, ACTION_RIGHT
+        and ACTION_FIRE
+        """
+        self._action = value
+
+    def __init__(self, action=0):
+        """
+        Initializes a new ActionInput holding down the keys of action.
+
+        Parameter action: the keys held down
+        Precondition: action is an int, a bitmask of ACTION_LEFT, ACTION_RIGHT
+        and ACTION_FIRE
+        """
+        self._action = action
+
+    def is_key_down(self, key):
+        """
+        Returns True if key is held down, False otherwise
+
+        Parameter key: the name of the key
+        Precondition: key is a str
+        """
+        return bool(self._action & ACTION_KEYS.get(key, 0))
+
+    def advance(self):
+        """
+        Does nothing, because the action only changes when it is set.
+        """
+        pass
+
+
+class WaveEnv(object):
+    """
+    A class to let a bot play a headless Wave one tick at a time.
+
+    Each call to reset starts a new Wave.  Each call to step plays one tick
+    of it, bringing the ship back the way replay.playwave does when a life is
+    lost, and returns the points scored in that tick as the reward.
+
+    INSTANCE ATTRIBUTES:
+        _settings: the keywords every Wave is made with, besides headless and
+                   seed [dict]
+        _maxticks: the most ticks a wave is played for, or None for no limit
+                   [int > 0 or None]
+        _wave:     the wave being played [Wave, or None before the first reset]
+        _input:    the keys given to _wave [ActionInput]
+        _ticks:    the ticks played in _wave [int >= 0]
+        _obs:      the observation, filled in again after every step [dict]
+    """
+
+    def getwave(self):
+        """
+        Returns self._wave
+        """
+        return self._wave
+
+    def getticks(self):
+        """
+        Returns self._ticks
+        """
+        return self._ticks
+
+    def __init__(self, maxticks=None, **settings):
+        """
+        Initializes a new WaveEnv. Call reset before the first step.
+
+        Parameter maxticks: the most ticks a wave is played for, or None for no
+        limit
+        Precondition: maxticks is an int > 0 or None
+
+        Parameter settings: the keywords to make each Wave with (rows, cols,
+        alienspeed, boltrate and speedcurve)
+        Precondition: settings are keywords of Wave.__init__ other than
+        headless and seed
+        """
+        self._settings = settings
+        self._maxticks = maxticks
+        self._wave = None
+        self._input = ActionInput()
+        self._ticks = 0
+        self._obs = {}
+
+    def reset(self, seed=None):
+        """
+        Starts a new wave and returns its observation (see observe).
+
+        Parameter seed: the seed for the random numbers of the wave, or None to
+        pick one at random
+        Precondition: seed is an int >= 0 or None
+        """
+        self._wave = Wave(headless=True, seed=seed, **self._settings)
+        self._input.setaction(0)
+        self._ticks = 0
+        return self.observe()
+
+    def step(self, action):
+        """
+        Plays one tick holding down the keys of action, and returns a tuple
+        (observation, reward, done, info).
+
+        reward is the points scored in the tick, and done is True once the wave
+        is won, lost, or has been played for maxticks ticks.  info is a
+        dictionary with the keys 'won' (True if every alien has been shot),
+        'truncated' (True if the wave was stopped by maxticks), 'lives' and
+        'ticks'.  Call reset to start a new wave once done is True.
+
+        Parameter action: the keys to hold down
+        Precondition: action is an int, a bitmask of ACTION_LEFT, ACTION_RIGHT
+        and ACTION_FIRE
+        """
+        wave = self._wave
+        score = wave.getscore()
+        self._input.setaction(int(action))
+        playwave(wave, self._input, 1)
+        self._ticks += 1
+
+        over = waveover(wave)
+        won = not wave.getaliensleft() and not wave.getaliensbelow()
+        truncated = (not over and self._maxticks is not None and
+                     self._ticks >= self._maxticks)
+        info = {'won': won, 'truncated': truncated,
+                'lives': wave.getlives(), 'ticks': self._ticks}
+        return (self.observe(), wave.getscore() - score, over or truncated,
+                info)
+
+    def observe(self):
+        """
+        Returns what a bot can see of the wave, as a dictionary
+
+        The keys are 'alive' (the alive flags of the Formation), 'origin' (its
+        origin as a tuple (x, y)), 'shipx' (the x-coordinate of the ship, or
+        None if it is destroyed), and 'boltx', 'bolty' and 'boltfromship' (see
+        BoltBuffer).  The arrays are views, not copies, so they change as the
+        wave plays and must not be changed by the caller.  The same dictionary
+        is returned every time.
+        """
+        wave = self._wave
+        formation = wave.getformation()
+        bolts = wave.getbolts()
+        ship = wave.getship()
+        obs = self._obs
+        obs['alive'] = formation.getalive()
+        obs['origin'] = formation.getorigin()
+        obs['shipx'] = None if ship is None else ship.getx()
+        obs['boltx'] = bolts.getx()
+        obs['bolty'] = bolts.gety()
+        obs['boltfromship'] = bolts.getfromship()
+        return obs
@@ -0,0 +1,346 @@
+"""
+Formation module for Alien Invaders
+
+This module contains the class Formation, which keeps track of where the aliens
+in a wave are and which of them are still alive.  The aliens never move
+relative to each other, so instead of storing a position for every alien the
+formation stores a fixed grid of slots and a single origin.  Marching the
+formation only moves the origin, so an alien step costs the same no matter how
+many aliens there are.  The position of an alien is only worked out (as the
+origin plus the offset of its slot) when it is drawn or tested for a collision.
+
+The alive flags are stored in a NumPy array with one entry per alien, so that
+finding the edges of the formation is a single array operation.
+
+Because the slots form a uniform grid, the grid itself works as the broad phase
+for collisions.  A box (such as a bolt) can only touch the aliens in the cells
+that its edges fall in, and those cells are found with a little arithmetic.
+Only the aliens in those few cells are tested.
+
+The formation also keeps counts of the live aliens (in total and in each
+column), the lowest live alien in each column, and a list of the columns that
+are not empty.  These are only updated when an alien is shot, so finding out how
+many aliens are left or picking an alien to fire a bolt never has to look at
+the whole grid.  The edges of the formation are cached relative to the origin,
+so they only have to be found again when an alien on an edge is shot.
+
+Formation does not draw anything.  The aliens of a windowed wave are built
+into a mesh from it by sprites.FormationBatch, which is drawn as part of a
+sprites.WaveScene.
+"""
+from consts import *
+from headless import overlaps
+import numpy
+
+
+class Formation(object):
+    """
+    A class to represent the grid of aliens in a wave.
+
+    Row 0 is the top row and column 0 is the left column, the same as the 2d
+    list of aliens in Wave.
+
+    INSTANCE ATTRIBUTES:
+        _rows:  the number of rows in the grid [int > 0]
+        _cols:  the number of columns in the grid [int > 0]
+        _originx: the x-coordinate of the center of the alien in row 0,
+                  column 0 [int or float]
+        _originy: the y-coordinate of the center of the alien in row 0,
+                  column 0 [int or float]
+        _slotx: the x offset from the origin of each column [numpy array of
+                float with cols entries]
+        _sloty: the y offset from the origin of each row [numpy array of float
+                with rows entries]
+        _alive: True for each alien that has not been shot [rows x cols numpy
+                array of bool]
+        _pitchx: the distance between the centers of neighbouring columns
+                 [float > 0]
+        _pitchy: the distance between the centers of neighbouring rows
+                 [float > 0]
+        _count: the number of live aliens [int >= 0]
+        _colcount: the number of live aliens in each column [list of int >= 0
+                   with cols entries]
+        _lowest: the row of the lowest live alien in each column, or -1 if the
+                 column is empty [list of int with cols entries]
+        _occupied: the columns that have a live alien, in no particular order
+                   [list of int]
+        _place: the position of each column in _occupied, or -1 if the column
+                is empty [list of int with cols entries]
+        _bounds: the left, right and bottom edges of the live aliens relative
+                 to the origin, or None if they must be found again [tuple of
+                 three floats, or None]
+    """
+
+    def getrows(self):
+        """
+        Returns self._rows
+        """
+        return self._rows
+
+    def getcols(self):
+        """
+        Returns self._cols
+        """
+        return self._cols
+
+    def getalive(self):
+        """
+        Returns self._alive
+
+        The array is not copied, so it must not be changed by the caller.
+        """
+        return self._alive
+
+    def getorigin(self):
+        """
+        Returns the origin of the formation as a tuple (x, y)
+        """
+        return (self._originx, self._originy)
+
+    def __init__(self, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW):
+        """
+        Initializes a new Formation with every alien alive.
+
+        The aliens are placed the same way as in the original game: the top row
+        is ALIEN_CEILING below the top of the screen and the left column is
+        ALIEN_H_SEP from the left edge, with ALIEN_H_SEP and ALIEN_V_SEP pixels
+        between neighbours.
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: the number of aliens in each row
+        Precondition: cols is an int > 0
+        """
+        self._rows = rows
+        self._cols = cols
+        self._originx = ALIEN_H_SEP + ALIEN_WIDTH/2
+        self._originy = GAME_HEIGHT - ALIEN_CEILING - ALIEN_HEIGHT/2
+        self._pitchx = float(ALIEN_H_SEP+ALIEN_WIDTH)
+        self._pitchy = float(ALIEN_V_SEP+ALIEN_HEIGHT)
+        self._slotx = numpy.arange(cols)*self._pitchx
+        self._sloty = numpy.arange(rows)*-self._pitchy
+        self._alive = numpy.ones((rows, cols), dtype=bool)
+        self._count = rows*cols
+        self._colcount = [rows]*cols
+        self._lowest = [rows-1]*cols
+        self._occupied = list(range(cols))
+        self._place = list(range(cols))
+        self._bounds = None
+
+    def getstate(self):
+        """
+        Returns the state of the formation as a dictionary
+
+        The dictionary has the keys 'rows', 'cols', 'origin' (a tuple (x, y)),
+        'alive' (a copy of _alive) and 'occupied' (a copy of _occupied).  The
+        order of _occupied is kept because Wave picks shooters by their place
+        in it.  Everything else can be worked out again from these.
+        """
+        return {'rows': self._rows, 'cols': self._cols,
+                'origin': (self._originx, self._originy),
+                'alive': self._alive.copy(), 'occupied': list(self._occupied)}
+
+    def setstate(self, state):
+        """
+        Puts the formation back into state.
+
+        The counts and the lowest alien of each column are worked out again
+        from the alive flags, and the cached edges are thrown away.
+
+        Parameter state: the state to put the formation in
+        Precondition: state was returned by getstate of a Formation with the
+        same number of rows and columns
+        """
+        self._originx, self._originy = state['origin']
+        self._alive[:, :] = state['alive']
+        self._count = int(numpy.count_nonzero(self._alive))
+        self._colcount = self._alive.sum(axis=0).tolist()
+        self._lowest = [-1]*self._cols
+        for col in range(self._cols):
+            rows = numpy.flatnonzero(self._alive[:, col])
+            if len(rows) > 0:
+                self._lowest[col] = int(rows[-1])
+        self._occupied = list(state['occupied'])
+        self._place = [-1]*self._cols
+        for pos in range(len(self._occupied)):
+            self._place[self._occupied[pos]] = pos
+        self._bounds = None
+
+    def isalive(self, row, col):
+        """
+        Returns True if the alien at row, col has not been shot
+
+        Parameter row: the row of the alien
+        Precondition: row is an int, 0 <= row < self._rows
+
+        Parameter col: the column of the alien
+        Precondition: col is an int, 0 <= col < self._cols
+        """
+        return bool(self._alive[row, col])
+
+    def getposition(self, row, col):
+        """
+        Returns the center of the alien at row, col as a tuple (x, y)
+
+        Parameter row: the row of the alien
+        Precondition: row is an int, 0 <= row < self._rows
+
+        Parameter col: the column of the alien
+        Precondition: col is an int, 0 <= col < self._cols
+        """
+        return (self._originx + float(self._slotx[col]),
+        self._originy + float(self._sloty[row]))
+
+    def count(self):
+        """
+        Returns the number of aliens that have not been shot
+        """
+        return self._count
+
+    def kill(self, row, col):
+        """
+        Marks the alien at row, col as shot and updates the counts.
+
+        If the column is now empty, it is swapped with the last column in
+        _occupied and removed.  If the alien was the lowest in its column, the
+        column is searched upward for the next live alien.  In either case the
+        cached edges may have changed, so they are thrown away.  Shooting an
+        alien that is already shot does nothing.
+
+        Parameter row: the row of the alien
+        Precondition: row is an int, 0 <= row < self._rows
+
+        Parameter col: the column of the alien
+        Precondition: col is an int, 0 <= col < self._cols
+        """
+        if not self._alive[row, col]:
+            return
+        self._alive[row, col] = False
+        self._count -= 1
+        self._colcount[col] -= 1
+
+        if self._colcount[col] == 0:
+            self._lowest[col] = -1
+            pos = self._place[col]
+            last = self._occupied.pop()
+            if last != col:
+                self._occupied[pos] = last
+                self._place[last] = pos
+            self._place[col] = -1
+            self._bounds = None
+        elif self._lowest[col] == row:
+            while not self._alive[row, col]:
+                row -= 1
+            self._lowest[col] = row
+            self._bounds = None
+
+    def march(self, dx, dy):
+        """
+        Moves every alien dx pixels right and dy pixels up by moving the origin.
+
+        Parameter dx: the distance to move right (negative for left)
+        Precondition: dx is an int or float
+
+        Parameter dy: the distance to move up (negative for down)
+        Precondition: dy is an int or float
+        """
+        self._originx += dx
+        self._originy += dy
+
+    def extent(self):
+        """
+        Returns the edges of the live aliens as a tuple (left, right, bottom)
+
+        If every alien has been shot, this method returns (GAME_WIDTH, 0,
+        GAME_HEIGHT) so that the formation is never at an edge of the screen or
+        below the defense line.
+
+        The edges are only searched for if they are not cached in _bounds.
+        Moving the formation does not change the cache, because the cache is
+        relative to the origin.
+        """
+        if self._count == 0:
+            return (GAME_WIDTH, 0, GAME_HEIGHT)
+        if self._bounds is None:
+            first = min(self._occupied)
+            last = max(self._occupied)
+            row = max(self._lowest)
+            self._bounds = (float(self._slotx[first]) - ALIEN_WIDTH/2,
+            float(self._slotx[last]) + ALIEN_WIDTH/2,
+            float(self._sloty[row]) - ALIEN_HEIGHT/2)
+        left, right, bottom = self._bounds
+        return (self._originx + left, self._originx + right,
+        self._originy + bottom)
+
+    def below(self, line):
+        """
+        Returns True if the bottom of any live alien is at or below line
+
+        Parameter line: the y-coordinate of the line
+        Precondition: line is an int or float
+        """
+        return self.extent()[2] <= line
+
+    def hit(self, left, bottom, right, top):
+        """
+        Returns the (row, col) of a live alien overlapping the given box, or
+        None if there is no such alien.
+
+        If the box overlaps more than one alien, the one in the top row (and
+        then the left column) is returned.
+
+        Only the aliens in the grid cells that the box falls in are tested.  A
+        cell is an alien's slot plus the gap to the next slot, so an alien
+        always lies inside its own cell.  Each of those aliens is tested with
+        the function overlaps.
+
+        Parameter left: the left edge of the box
+        Precondition: left is an int or float
+
+        Parameter bottom: the bottom edge of the box
+        Precondition: bottom is an int or float <= top
+
+        Parameter right: the right edge of the box
+        Precondition: right is an int or float >= left
+
+        Parameter top: the top edge of the box
+        Precondition: top is an int or float
+        """
+        cellleft = self._originx - ALIEN_WIDTH/2
+        celltop = self._originy + ALIEN_HEIGHT/2
+        firstcol = max(int((left - cellleft)//self._pitchx), 0)
+        lastcol = min(int((right - cellleft)//self._pitchx), self._cols-1)
+        firstrow = max(int((celltop - top)//self._pitchy), 0)
+        lastrow = min(int((celltop - bottom)//self._pitchy), self._rows-1)
+
+        for row in range(firstrow, lastrow+1):
+            y = self._originy - row*self._pitchy
+            for col in range(firstcol, lastcol+1):
+                x = self._originx + col*self._pitchx
+                if self._alive[row, col] and overlaps(x - ALIEN_WIDTH/2,
+                    y - ALIEN_HEIGHT/2, x + ALIEN_WIDTH/2, y + ALIEN_HEIGHT/2,
+                    left, bottom, right, top):
+                    return (row, col)
+        return None
+
+    def columns(self):
+        """
+        Returns the indices of the columns that still have a live alien
+
+        The result is a list of int in no particular order.  The list is not
+        copied, so it must not be changed by the caller.
+        """
+        return self._occupied
+
+    def lowest(self, col):
+        """
+        Returns the row of the lowest live alien in column col, or None if
+        every alien in the column has been shot
+
+        Parameter col: the column to search
+        Precondition: col is an int, 0 <= col < self._cols
+        """
+        if self._lowest[col] < 0:
+            return None
+        return self._lowest[col]
@@ -0,0 +1,198 @@
+"""
+Governor module for Alien Invaders
+
+This module contains the class Governor, which keeps the game smooth on slow
+machines.  Invaders tells the governor the time between the starts of two
+frames (the dt that Kivy passes to update), which takes in everything that
+happened in between: the work of the game, and Kivy rendering the canvas.  When
+the frames of the last second or so have been slower than the budget, the
+governor raises its level, and Invaders leaves out more of the work that the
+player will not miss.  When the frames are fast again, the level comes back
+down.  The simulation of the wave is never left out, so the game always plays
+at the same speed.
+
+The levels, from least to most cut back, are:
+
+    normal    everything is done every frame
+    nohud     the score, the lives and the performance overlay are only laid
+              out again every few frames, which saves making the textures of
+              their text again
+    noeffects the ship and bolts are no longer moved between ticks, so the
+              vertices of the wave are only filled in again in frames where it
+              was updated
+    halfrate  the vertices of the wave are only filled in again every other
+              frame it was updated
+
+Each level also does everything the levels before it do.  No level renders
+less: Kivy still draws the whole canvas every frame, and a wave that is not
+filled in again is simply drawn where it was the last time.  Like Profiler, the
+frame times are kept in a ring buffer of fixed size, so the governor never
+grows and never makes new objects while the game runs.
+"""
+
+# The names of the levels, from least to most cut back
+GOVERNOR_LEVELS = ('normal', 'nohud', 'noeffects', 'halfrate')
+
+# The number of frames the governor remembers
+GOVERNOR_FRAMES = 60
+
+# The seconds a frame may take, from the start of one to the start of the
+# next (50 fps, so the small jitter of a 60 fps display never counts as slow)
+GOVERNOR_BUDGET = 1/50
+
+# The level goes up when the mean frame is over this much of the budget, and
+# comes down when it is under LOWER_AT of the budget.  The frames of a display
+# that keeps up at 60 fps are 0.83 of the budget.
+RAISE_AT = 1.0
+LOWER_AT = 0.9
+
+# The number of frames between refreshes of the score and lives when the level
+# is nohud or above
+HUD_FRAMES = 10
+
+
+class Governor(object):
+    """
+    A class to decide how much drawing work to leave out of each frame.
+
+    Each frame, call record with the seconds since the last frame.  Once the
+    governor has a full ring of frames, it compares their mean with the budget.
+    After the level changes, it waits for a full ring of new frames before
+    changing it again, so it does not flicker between levels.
+
+    INSTANCE ATTRIBUTES:
+        _budget:   the seconds a frame may take [float > 0]
+        _ring:     the seconds taken by each remembered frame [list of float
+                   with GOVERNOR_FRAMES entries]
+        _total:    the sum of _ring [float >= 0]
+        _next:     the index in _ring of the next frame to record
+                   [int, 0 <= _next < GOVERNOR_FRAMES]
+        _wait:     the frames left to record before the level may change
+                   again [int >= 0]
+        _level:    the current level [int, 0 <= _level < len(GOVERNOR_LEVELS)]
+        _entered:  the number of times each level has been entered [list of
+                   int >= 0, one per level]
+        _frames:   the number of frames recorded at each level [list of int
+                   >= 0, one per level]
+    """
+
+    def getlevel(self):
+        """
+        Returns self._level
+        """
+        return self._level
+
+    def getbudget(self):
+        """
+        Returns self._budget
+        """
+        return self._budget
+
+    def __init__(self, budget=GOVERNOR_BUDGET):
+        """
+        Initializes a new Governor at level normal.
+
+        Parameter budget: the seconds a frame may take
+        Precondition: budget is a number (int or float) > 0
+        """
+        self._budget = budget
+        self._ring = [0.0]*GOVERNOR_FRAMES
+        self._total = 0.0
+        self._next = 0
+        self._wait = GOVERNOR_FRAMES
+        self._level = 0
+        self._entered = [0]*len(GOVERNOR_LEVELS)
+        self._entered[0] = 1
+        self._frames = [0]*len(GOVERNOR_LEVELS)
+
+    def record(self, seconds):
+        """
+        Records the seconds taken by a frame, and changes the level if the
+        frames have been over or well under the budget.
+
+        Parameter seconds: the seconds from the start of the last frame to
+        the start of this one
+        Precondition: seconds is a number (int or float) >= 0
+        """
+        self._total += seconds - self._ring[self._next]
+        self._ring[self._next] = seconds
+        self._next = (self._next + 1) % GOVERNOR_FRAMES
+        self._frames[self._level] += 1
+        if self._wait > 0:
+            self._wait -= 1
+            return
+
+        mean = self._total/GOVERNOR_FRAMES
+        last = len(GOVERNOR_LEVELS)-1
+        if mean > RAISE_AT*self._budget and self._level < last:
+            self.setlevel(self._level + 1)
+        elif mean < LOWER_AT*self._budget and self._level > 0:
+            self.setlevel(self._level - 1)
+
+    def setlevel(self, value):
+        """
+        Sets self._level to value, and counts it as entered
+
+        The level is then held for at least GOVERNOR_FRAMES frames.
+
+        Parameter value: the value self._level is set to
+        Precondition: value is an int, 0 <= value < len(GOVERNOR_LEVELS)
+        """
+        self._level = value
+        self._entered[value] += 1
+        self._wait = GOVERNOR_FRAMES
+
+    def getmean(self):
+        """
+        Returns the mean seconds taken by the remembered frames
+        """
+        return self._total/GOVERNOR_FRAMES
+
+    def getstats(self):
+        """
+        Returns the counters of the governor as a dictionary
+
+        The dictionary has an entry for each name in GOVERNOR_LEVELS, which is
+        a tuple (times entered, frames spent at that level).  A new dictionary
+        is made each time, so it is safe to keep.
+        """
+        return dict((GOVERNOR_LEVELS[i], (self._entered[i], self._frames[i]))
+                    for i in range(len(GOVERNOR_LEVELS)))
+
+    def hudframe(self, frame):
+        """
+        Returns True if the score and lives should be laid out again in frame
+
+        Below level nohud this is always True; otherwise it is True every
+        HUD_FRAMES frames.
+
+        Parameter frame: the number of the frame
+        Precondition: frame is an int >= 0
+        """
+        return self._level < 1 or frame % HUD_FRAMES == 0
+
+    def interpolate(self):
+        """
+        Returns True if the ship and bolts should be moved between ticks
+        """
+        return self._level < 2
+
+    def drawframe(self, updated, count):
+        """
+        Returns True if the wave should be drawn again in this frame
+
+        Below level noeffects the wave is always drawn again.  At noeffects it
+        is only drawn again if it was updated in this frame, since without
+        moving things between ticks nothing else changes.  At halfrate it is
+        only drawn again every other time it is updated.
+
+        Parameter updated: True if the wave was updated in this frame
+        Precondition: updated is a bool
+
+        Parameter count: the number of frames so far in which the wave was
+        updated
+        Precondition: count is an int >= 0
+        """
+        if self._level < 2:
+            return True
+        return updated and (self._level < 3 or count % 2 == 0)
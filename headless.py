@@ -0,0 +1,333 @@
+"""
+Headless module for Alien Invaders
+
+This module contains stand-ins for Ship and for GInput so that a Wave can be
+played without Kivy or a window.  None of the classes here draw anything; they
+only keep the geometry that Wave needs to move the ship and test for
+collisions.
+
+It also contains the function overlaps, the one test for whether two boxes
+overlap.  Formation, BoltBuffer and VecWave all use it, so every collision in
+the game is decided by the same comparison of edges.
+
+A headless Wave is made with Wave(headless=True).  It can then be advanced with
+the function simulate, using a ScriptedInput in place of the GInput that the
+application would normally pass to Wave.update.
+"""
+from consts import *
+import numpy
+
+# PRIMARY RULE: This module is not allowed to import game2d, Kivy or models.py
+# (even through another module), or a headless Wave could no longer be made
+# without them.
+
+
+def overlaps(left, bottom, right, top, otherleft, otherbottom, otherright,
+    othertop, out=None, scratch=None):
+    """
+    Returns True if the box with edges left, bottom, right and top overlaps the
+    box with edges otherleft, otherbottom, otherright and othertop, False
+    otherwise
+
+    The edges are compared directly, and boxes that only touch along an edge
+    count as overlapping.  No tuples or other objects are made, so it is cheap
+    enough to call for every pair of objects in every tick.  The edges may also
+    be NumPy arrays, in which case every pair of boxes is tested at once and an
+    array of bool is returned.  If out and scratch are given as well, the
+    result is written into out and nothing new is made at all; scratch is
+    overwritten along the way.
+
+    Parameter left: the left edge of the first box
+    Precondition: left is an int or float (or an array of them)
+
+    Parameter bottom: the bottom edge of the first box
+    Precondition: bottom is an int or float (or an array of them) <= top
+
+    Parameter right: the right edge of the first box
+    Precondition: right is an int or float (or an array of them) >= left
+
+    Parameter top: the top edge of the first box
+    Precondition: top is an int or float (or an array of them)
+
+    Parameter otherleft: the left edge of the second box
+    Precondition: otherleft is an int or float (or an array of them)
+
+    Parameter otherbottom: the bottom edge of the second box
+    Precondition: otherbottom is an int or float (or an array of them) <=
+    othertop
+
+    Parameter otherright: the right edge of the second box
+    Precondition: otherright is an int or float (or an array of them) >=
+    otherleft
+
+    Parameter othertop: the top edge of the second box
+    Precondition: othertop is an int or float (or an array of them)
+
+    Parameter out: the array to write the result into, or None
+    Precondition: out is None or a numpy array of bool the shape of the result
+
+    Parameter scratch: an array to work in, or None
+    Precondition: scratch is None if out is None, and otherwise a numpy array
+    of bool the shape of out
+    """
+    if out is None:
+        return ((left <= otherright) & (otherleft <= right) &
+                (bottom <= othertop) & (otherbottom <= top))
+    numpy.less_equal(left, otherright, out=out)
+    for low, high in ((otherleft, right), (bottom, othertop),
+        (otherbottom, top)):
+        numpy.less_equal(low, high, out=scratch)
+        out &= scratch
+    return out
+
+
+class Box(object):
+    """
+    A class to represent an axis-aligned rectangle with no picture.
+
+    Box has the same position attributes as a GObject (x, y, width, height,
+    left, right, top and bottom) so that Wave can treat it the same way.  The
+    edge attributes are computed from the center and the size.
+
+    INSTANCE ATTRIBUTES:
+        x:      the x-coordinate of the center [int or float]
+        y:      the y-coordinate of the center [int or float]
+        width:  the width of the box [int or float >= 0]
+        height: the height of the box [int or float >= 0]
+    """
+
+    @property
+    def left(self):
+        """
+        The x-coordinate of the left edge, computed from x and width
+        """
+        return self.x - self.width/2
+
+    @left.setter
+    def left(self, value):
+        """
+        Moves the box so that its left edge is at value
+        """
+        self.x = value + self.width/2
+
+    @property
+    def right(self):
+        """
+        The x-coordinate of the right edge, computed from x and width
+        """
+        return self.x + self.width/2
+
+    @right.setter
+    def right(self, value):
+        """
+        Moves the box so that its right edge is at value
+        """
+        self.x = value - self.width/2
+
+    @property
+    def top(self):
+        """
+        The y-coordinate of the top edge, computed from y and height
+        """
+        return self.y + self.height/2
+
+    @top.setter
+    def top(self, value):
+        """
+        Moves the box so that its top edge is at value
+        """
+        self.y = value - self.height/2
+
+    @property
+    def bottom(self):
+        """
+        The y-coordinate of the bottom edge, computed from y and height
+        """
+        return self.y - self.height/2
+
+    @bottom.setter
+    def bottom(self, value):
+        """
+        Moves the box so that its bottom edge is at value
+        """
+        self.y = value + self.height/2
+
+    def __init__(self, x=0, y=0, width=0, height=0, **keywords):
+        """
+        Initializes a new Box.
+
+        The keywords left, right, top and bottom may be given instead of x and
+        y, just like for a GObject.  Any other keyword (such as source) is
+        ignored, because a Box has nothing to draw.
+
+        Parameter x: The x-coordinate of the center
+        Precondition: x is an int or float
+
+        Parameter y: The y-coordinate of the center
+        Precondition: y is an int or float
+
+        Parameter width: The width of the box
+        Precondition: width is an int or float >= 0
+
+        Parameter height: The height of the box
+        Precondition: height is an int or float >= 0
+        """
+        self.width = width
+        self.height = height
+        self.x = x
+        self.y = y
+        for edge in ('left', 'right', 'top', 'bottom'):
+            if edge in keywords:
+                setattr(self, edge, keywords[edge])
+
+    def sety(self, value):
+        """
+        Sets self.y to value
+
+        Parameter value: the value self.y is set to
+        Precondition: value is int or float
+        """
+        self.y = value
+
+    def setx(self, value):
+        """
+        Sets self.x to value
+
+        Parameter value: the value self.x is set to
+        Precondition: value is int or float
+        """
+        self.x = value
+
+    def gety(self):
+        """
+        Returns self.y
+        """
+        return self.y
+
+    def getx(self):
+        """
+        Returns self.x
+        """
+        return self.x
+
+    def gettop(self):
+        """
+        Returns self.top
+        """
+        return self.top
+
+    def getbottom(self):
+        """
+        Returns self.bottom
+        """
+        return self.bottom
+
+    def getright(self):
+        """
+        Returns self.right
+        """
+        return self.right
+
+    def getleft(self):
+        """
+        Returns self.left
+        """
+        return self.left
+
+
+class HeadlessShip(Box):
+    """
+    A class to stand in for Ship when there is no window.
+
+    A wave that is not headless uses it as well, because its WaveScene draws
+    the ship from the sprite atlas and only needs to know where the ship is.
+    """
+
+
+class ScriptedInput(object):
+    """
+    A class to stand in for GInput, playing back a fixed list of key presses.
+
+    The script is a list with one entry per frame.  Each entry is a collection
+    of the keys (such as 'left', 'right' and 'spacebar') held down in that
+    frame.  After the script runs out, no keys are held down, unless loop is
+    True, in which case the script starts over.
+
+    INSTANCE ATTRIBUTES:
+        _script: the keys held down in each frame [list of sets of str]
+        _frame:  the index of the current frame [int >= 0]
+        _loop:   True if the script starts over when it runs out [bool]
+    """
+
+    def getframe(self):
+        """
+        Returns self._frame
+        """
+        return self._frame
+
+    def __init__(self, script=(), loop=False):
+        """
+        Initializes a new ScriptedInput at the first frame of script.
+
+        Parameter script: the keys held down in each frame
+        Precondition: script is a sequence of collections of str
+
+        Parameter loop: True if the script should start over when it runs out
+        Precondition: loop is a bool
+        """
+        self._script = [frozenset(keys) for keys in script]
+        self._frame = 0
+        self._loop = loop
+
+    def is_key_down(self, key):
+        """
+        Returns True if key is held down in the current frame, False otherwise
+
+        Parameter key: the name of the key
+        Precondition: key is a str
+        """
+        frame = self._frame
+        if self._loop and len(self._script) > 0:
+            frame = frame % len(self._script)
+        if frame >= len(self._script):
+            return False
+        return key in self._script[frame]
+
+    def advance(self):
+        """
+        Moves the script on to the next frame.
+        """
+        self._frame += 1
+
+
+def simulate(wave, input, frames, dt=1/60):
+    """
+    Advances wave by up to frames frames and returns the number of frames run.
+
+    The simulation stops early when the wave is over: when the ship is
+    destroyed, when all the aliens are shot, or when an alien gets below the
+    defense line.  Unlike Invaders, this function does not pause to respawn the
+    ship.  Callers that want to keep playing should call wave.newship() and
+    call this function again.
+
+    Parameter wave: the wave to advance
+    Precondition: wave is a Wave made with headless=True
+
+    Parameter input: the key presses to play
+    Precondition: input is a ScriptedInput (or has is_key_down and advance)
+
+    Parameter frames: the largest number of frames to run
+    Precondition: frames is an int >= 0
+
+    Parameter dt: The time in seconds of each frame
+    Precondition: dt is a number (int or float) > 0
+    """
+    count = 0
+    while count < frames:
+        wave.update(input, dt)
+        input.advance()
+        count += 1
+        if (wave.getship() is None or wave.getaliensbelow() or
+            not wave.getaliensleft()):
+            break
+    return count
@@ -102,25 +102,6 @@ class Ship(GImage):
         """
         return self.bottom
 
-    def collides(self, bolt):
-        """
-        This function returns True if bolt overlaps with the ship and bolt was
-        fired from an alien. It False otherwise
-        Using the contains method inherited from GImage, all four corners of
-        bolt are tested to see if they overlap with the ship. The attribute
-        _fromship of bolt is also tested.
-        """
-
-        shipbolt = bolt.getfromship()
-        if shipbolt == True:
-            return False
-        else:
-            result1 = self.contains((bolt.getright(),bolt.getbottom()))
-            result2 = self.contains((bolt.getleft(),bolt.getbottom()))
-            result3 = self.contains((bolt.getright(),bolt.gettop()))
-            result4 = self.contains((bolt.getright(),bolt.gettop()))
-            return max(result1, result2, result3, result4)
-
 
 class Alien(GImage):
     """
@@ -198,24 +179,6 @@ class Alien(GImage):
         """
         return self.left
 
-    def collides(self, bolt):
-        """
-        This function returns True if bolt overlaps with the alien and bolt was
-        fired from the Ship. It returns False otherwise
-        Using the contains method inherited from GImage, all four corners of
-        bolt are tested to see if they overlap with the alien. The attribute
-        _fromship of bolt is also tested.
-        """
-        shipbolt = bolt.getfromship()
-        if shipbolt == False:
-            return False
-        else:
-            result1 = self.contains((bolt.getright(),bolt.getbottom()))
-            result2 = self.contains((bolt.getleft(),bolt.getbottom()))
-            result3 = self.contains((bolt.getright(),bolt.gettop()))
-            result4 = self.contains((bolt.getright(),bolt.gettop()))
-            return max(result1, result2, result3, result4)
-
 
 class Bolt(GRectangle):
     """
@@ -0,0 +1,159 @@
+"""
+Profiler module for Alien Invaders
+
+This module contains the class Profiler, which records how long each phase of
+Wave.update takes.  The times are kept in a ring buffer with room for a fixed
+number of frames, so a profiler never grows and never makes new objects while
+it records.  Recording can be switched on and off while the game is running;
+when it is off, each call into the profiler returns right away.
+"""
+import time
+
+# The phases of Wave.update, in the order they happen
+PROFILE_PHASES = ('ship move', 'march', 'fire', 'bolt move', 'collisions',
+                  'below test', 'tracker')
+
+# The number of frames a profiler remembers
+PROFILE_FRAMES = 120
+
+
+class Profiler(object):
+    """
+    A class to record the time spent in each phase of Wave.update.
+
+    A frame is recorded by calling start, then lap after each phase (with the
+    index of that phase in PROFILE_PHASES), then stop.  A phase may be lapped
+    more than once in a frame; the times are added together.
+
+    INSTANCE ATTRIBUTES:
+        _enabled: True if frames are being recorded [bool]
+        _ring:    the seconds spent in each phase of each remembered frame
+                  [list of PROFILE_FRAMES lists of float, one per phase]
+        _totals:  the seconds spent in each remembered frame [list of float
+                  with PROFILE_FRAMES entries]
+        _next:    the index in _ring of the next frame to record
+                  [int, 0 <= _next < PROFILE_FRAMES]
+        _frames:  the number of frames recorded since the profiler was last
+                  cleared [int >= 0]
+        _start:   the time the current frame started [float]
+        _last:    the time the last phase ended [float]
+    """
+
+    def isenabled(self):
+        """
+        Returns self._enabled
+        """
+        return self._enabled
+
+    def setenabled(self, value):
+        """
+        Sets self._enabled to value
+
+        Turning the profiler on clears anything it recorded before.
+
+        Parameter value: the value self._enabled is set to
+        Precondition: value is a bool
+        """
+        if value and not self._enabled:
+            self.clear()
+        self._enabled = value
+
+    def __init__(self, enabled=False):
+        """
+        Initializes a new, empty Profiler.
+
+        Parameter enabled: True if the profiler should start recording
+        Precondition: enabled is a bool
+        """
+        self._ring = [[0.0]*len(PROFILE_PHASES) for i in range(PROFILE_FRAMES)]
+        self._totals = [0.0]*PROFILE_FRAMES
+        self._enabled = enabled
+        self.clear()
+
+    def clear(self):
+        """
+        Forgets every frame recorded so far.
+        """
+        self._next = 0
+        self._frames = 0
+        self._start = 0.0
+        self._last = 0.0
+
+    def start(self):
+        """
+        Starts recording a frame.
+        """
+        if self._enabled:
+            row = self._ring[self._next]
+            for i in range(len(row)):
+                row[i] = 0.0
+            self._start = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """
+        Adds the time since the last lap (or since start) to phase.
+
+        Parameter phase: the index of the phase that just ended
+        Precondition: phase is an int, 0 <= phase < len(PROFILE_PHASES)
+        """
+        if self._enabled:
+            now = time.perf_counter()
+            self._ring[self._next][phase] += now - self._last
+            self._last = now
+
+    def stop(self):
+        """
+        Finishes recording a frame.
+        """
+        if self._enabled:
+            self._totals[self._next] = time.perf_counter() - self._start
+            self._next = (self._next + 1) % PROFILE_FRAMES
+            self._frames += 1
+
+    def count(self):
+        """
+        Returns the number of frames remembered (at most PROFILE_FRAMES)
+        """
+        return min(self._frames, PROFILE_FRAMES)
+
+    def getlast(self):
+        """
+        Returns the seconds spent in each phase of the last frame recorded, as
+        a list in the order of PROFILE_PHASES
+
+        The result is a row of _ring, not a copy, so it is only good until the
+        next frame starts and must not be changed by the caller.
+        """
+        return self._ring[(self._next - 1) % PROFILE_FRAMES]
+
+    def getlasttotal(self):
+        """
+        Returns the seconds taken by the whole of the last frame recorded
+        """
+        return self._totals[(self._next - 1) % PROFILE_FRAMES]
+
+    def getaverages(self):
+        """
+        Returns the mean milliseconds per frame spent in each phase
+
+        The result is a dictionary from each name in PROFILE_PHASES, and from
+        'frame' for the whole frame, over the remembered frames.  If no frames
+        are remembered, every value is 0.
+        """
+        n = self.count()
+        result = {}
+        for i in range(len(PROFILE_PHASES)):
+            total = 0.0
+            for row in self._ring[:n]:
+                total += row[i]
+            result[PROFILE_PHASES[i]] = 1000*total/n if n > 0 else 0.0
+        result['frame'] = 1000*sum(self._totals[:n])/n if n > 0 else 0.0
+        return result
+
+    def getworst(self):
+        """
+        Returns the most milliseconds taken by any remembered frame, or 0 if no
+        frames are remembered
+        """
+        n = self.count()
+        return 1000*max(self._totals[:n]) if n > 0 else 0.0
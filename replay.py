@@ -0,0 +1,508 @@
+"""
+Replay module for Alien Invaders
+
+This module records the keys held down during a wave so that the wave can be
+played again exactly.  A Wave gets all of its random numbers from its own seed,
+so a wave made with the same seed and given the same keys in every tick always
+plays out the same way.  A replay is therefore just the seed, the size of the
+formation, the settings of the wave (alienspeed, boltrate and speedcurve, see
+Wave) and one byte of keys per tick.
+
+Replays are saved in a small binary file:
+
+    4 bytes   the magic number b'SIRP'
+    1 byte    the version of the format (REPLAY_VERSION)
+    8 bytes   the seed of the wave
+    2 bytes   the number of rows of aliens
+    2 bytes   the number of aliens in each row
+    4 bytes   the number of ticks
+    8 bytes   the seconds between alien steps at the start, as a double
+    4 bytes   the most alien steps between alien bolts
+    8 bytes   the speed curve, as a double
+    n bytes   the keys held down in each tick, as a bitmask of REPLAY_KEYS
+
+All numbers are little-endian, and all but the doubles are unsigned.  Version 1
+replays stop after the number of ticks (REPLAY_HEADER_V1) and are played with
+the default settings, which were the only ones then.
+
+A ReplayPlayer plays a replay through a headless Wave as fast as it can, and can
+seek to any tick.  While it plays, it saves a snapshot of the wave (see
+Wave.getstate) every SNAPSHOT_INTERVAL ticks.  To seek, it puts the wave back
+to the nearest snapshot at or before the tick and plays forward from there, so
+no seek ever plays more than SNAPSHOT_INTERVAL ticks (once the snapshots exist).
+
+This module can also be run from the command line to look at a replay:
+
+    python replay.py FILE [--seek TICK]
+"""
+from consts import *
+from headless import simulate
+from wave import Wave, SPEED_CURVE
+import argparse
+import struct
+
+# The keys recorded in a replay; key i is bit i of each tick's byte
+REPLAY_KEYS = ('left', 'right', 'spacebar')
+
+# The first four bytes of every replay file
+REPLAY_MAGIC = b'SIRP'
+
+# The version of the replay file format
+REPLAY_VERSION = 2
+
+# The header of a replay file (after the magic number)
+REPLAY_HEADER = struct.Struct('<BQHHIdId')
+
+# The header of a version 1 replay file, which had no settings
+REPLAY_HEADER_V1 = struct.Struct('<BQHHI')
+
+# The number of ticks between the snapshots taken by a ReplayPlayer
+SNAPSHOT_INTERVAL = 600
+
+
+def keymask(input):
+    """
+    Returns the keys in REPLAY_KEYS held down in input, as a bitmask
+
+    Parameter input: the input to read
+    Precondition: input is a GInput (or has is_key_down)
+    """
+    mask = 0
+    for i in range(len(REPLAY_KEYS)):
+        if input.is_key_down(REPLAY_KEYS[i]):
+            mask |= 1 << i
+    return mask
+
+
+class Recorder(object):
+    """
+    A class to record the keys given to a Wave, one tick at a time.
+
+    A Recorder stands between a GInput and a Wave.  Call tick once before each
+    Wave.update and pass the Recorder to update in place of the GInput.  The
+    keys the wave sees are exactly the keys recorded, even if the player
+    presses or lets go of a key in the middle of the tick.
+
+    INSTANCE ATTRIBUTES:
+        _input:   the input being recorded [GInput]
+        _keys:    the bitmask of keys held down in each tick so far [bytearray]
+        _current: the bitmask of keys held down in the current tick [int]
+    """
+
+    def getkeys(self):
+        """
+        Returns self._keys
+
+        The bytearray is not copied, so it must not be changed by the caller.
+        """
+        return self._keys
+
+    def __init__(self, input):
+        """
+        Initializes a new Recorder with no ticks recorded.
+
+        Parameter input: the input to record
+        Precondition: input is a GInput (or has is_key_down)
+        """
+        self._input = input
+        self._keys = bytearray()
+        self._current = 0
+
+    def tick(self):
+        """
+        Reads the keys held down now and records them as the next tick.
+        """
+        self._current = keymask(self._input)
+        self._keys.append(self._current)
+
+    def is_key_down(self, key):
+        """
+        Returns True if key was held down when tick was last called
+
+        Parameter key: the name of the key
+        Precondition: key is a str in REPLAY_KEYS
+        """
+        return bool(self._current & (1 << REPLAY_KEYS.index(key)))
+
+
+class ReplayInput(object):
+    """
+    A class to stand in for GInput, playing back the keys of a replay.
+
+    ReplayInput works the same way as headless.ScriptedInput: it starts at the
+    first tick and moves on one tick each time advance is called.  After the
+    last tick, no keys are held down.
+
+    INSTANCE ATTRIBUTES:
+        _keys:  the bitmask of keys held down in each tick [bytes or bytearray]
+        _frame: the index of the current tick [int >= 0]
+    """
+
+    def getframe(self):
+        """
+        Returns self._frame
+        """
+        return self._frame
+
+    def setframe(self, value):
+        """
+        Sets self._frame to value
+
+        Parameter value: the value self._frame is set to
+        Precondition: value is an int >= 0
+        """
+        self._frame = value
+
+    def __init__(self, keys):
+        """
+        Initializes a new ReplayInput at the first tick of keys.
+
+        Parameter keys: the bitmask of keys held down in each tick
+        Precondition: keys is a bytes or bytearray
+        """
+        self._keys = keys
+        self._frame = 0
+
+    def is_key_down(self, key):
+        """
+        Returns True if key is held down in the current tick, False otherwise
+
+        Parameter key: the name of the key
+        Precondition: key is a str in REPLAY_KEYS
+        """
+        if self._frame >= len(self._keys):
+            return False
+        return bool(self._keys[self._frame] & (1 << REPLAY_KEYS.index(key)))
+
+    def advance(self):
+        """
+        Moves on to the next tick.
+        """
+        self._frame += 1
+
+
+class Replay(object):
+    """
+    A class to represent a recorded wave.
+
+    INSTANCE ATTRIBUTES:
+        _seed: the seed of the wave [int >= 0]
+        _rows: the number of rows of aliens [int > 0]
+        _cols: the number of aliens in each row [int > 0]
+        _keys: the bitmask of keys held down in each tick [bytes]
+        _settings: the alienspeed, boltrate and speedcurve of the wave [dict
+                   from str to number]
+    """
+
+    def getseed(self):
+        """
+        Returns self._seed
+        """
+        return self._seed
+
+    def getrows(self):
+        """
+        Returns self._rows
+        """
+        return self._rows
+
+    def getcols(self):
+        """
+        Returns self._cols
+        """
+        return self._cols
+
+    def getkeys(self):
+        """
+        Returns self._keys
+        """
+        return self._keys
+
+    def getsettings(self):
+        """
+        Returns a copy of self._settings, to be given to Wave as keywords
+        """
+        return dict(self._settings)
+
+    def __init__(self, seed, keys, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW,
+        alienspeed=ALIEN_SPEED, boltrate=BOLT_RATE, speedcurve=SPEED_CURVE):
+        """
+        Initializes a new Replay.
+
+        Parameter seed: the seed of the wave
+        Precondition: seed is an int >= 0
+
+        Parameter keys: the bitmask of keys held down in each tick
+        Precondition: keys is a bytes or bytearray
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: the number of aliens in each row
+        Precondition: cols is an int > 0
+
+        Parameter alienspeed: the seconds between alien steps at the start
+        Precondition: alienspeed is a number (int or float) > 0
+
+        Parameter boltrate: the most alien steps between alien bolts
+        Precondition: boltrate is an int > 0
+
+        Parameter speedcurve: the number the seconds between alien steps are
+        multiplied by for each alien shot
+        Precondition: speedcurve is a number (int or float), 0 < speedcurve <= 1
+        """
+        self._seed = seed
+        self._rows = rows
+        self._cols = cols
+        self._keys = bytes(keys)
+        self._settings = {'alienspeed': alienspeed, 'boltrate': boltrate,
+                          'speedcurve': speedcurve}
+
+    def __len__(self):
+        """
+        Returns the number of ticks in the replay
+        """
+        return len(self._keys)
+
+    def save(self, path):
+        """
+        Writes the replay to the file path, in the format described above.
+
+        Parameter path: the name of the file to write
+        Precondition: path is a str
+        """
+        with open(path, 'wb') as file:
+            file.write(REPLAY_MAGIC)
+            file.write(REPLAY_HEADER.pack(REPLAY_VERSION, self._seed,
+            self._rows, self._cols, len(self._keys),
+            self._settings['alienspeed'], self._settings['boltrate'],
+            self._settings['speedcurve']))
+            file.write(self._keys)
+
+
+def load(path):
+    """
+    Returns the Replay saved in the file path
+
+    This function raises a ValueError if the file is not a replay, is from a
+    newer version of the format, or is cut short.
+
+    Parameter path: the name of the file to read
+    Precondition: path is a str
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:len(REPLAY_MAGIC)] != REPLAY_MAGIC:
+        raise ValueError(path+' is not a replay file')
+    start = len(REPLAY_MAGIC)
+    if len(data) < start + REPLAY_HEADER_V1.size:
+        raise ValueError(path+' is cut short')
+    version = data[start]
+    if version > REPLAY_VERSION:
+        raise ValueError(path+' is from a newer version ('+str(version)+')')
+    header = REPLAY_HEADER if version >= 2 else REPLAY_HEADER_V1
+    if len(data) < start + header.size:
+        raise ValueError(path+' is cut short')
+    values = header.unpack_from(data, start)
+    start += header.size
+    version, seed, rows, cols, ticks = values[:5]
+    settings = {}
+    if version >= 2:
+        settings = dict(zip(('alienspeed', 'boltrate', 'speedcurve'),
+        values[5:]))
+    keys = data[start:start+ticks]
+    if len(keys) < ticks:
+        raise ValueError(path+' is cut short')
+    return Replay(seed, keys, rows, cols, **settings)
+
+
+def playwave(wave, input, ticks):
+    """
+    Plays wave for up to ticks ticks the way Invaders does, and returns the
+    number of ticks played.
+
+    When the ship is destroyed and lives are left, a life is taken away and the
+    ship comes back right away (Invaders waits for the player to press S, but
+    no ticks happen while it waits).  Play stops early when the wave is lost or
+    won.  A ship destroyed on the tick the aliens cross the line or the last
+    alien dies ends the wave without costing a life or coming back.
+
+    Parameter wave: the wave to play
+    Precondition: wave is a Wave
+
+    Parameter input: the keys to play
+    Precondition: input is a ReplayInput or headless.ScriptedInput
+
+    Parameter ticks: the most ticks to play
+    Precondition: ticks is an int >= 0
+    """
+    played = 0
+    while played < ticks:
+        played += simulate(wave, input, ticks - played)
+        if wave.getaliensbelow() or not wave.getaliensleft():
+            break
+        if wave.getship() is None and wave.getlives() >= 1:
+            wave.setlives(wave.getlives() - 1)
+            if wave.getlives() == 0:
+                break
+            wave.newship()
+        else:
+            break
+    return played
+
+
+def waveover(wave):
+    """
+    Returns True if wave has been won or lost, False otherwise
+
+    This should only be called after playwave, which brings the ship back
+    whenever lives are left.
+
+    Parameter wave: the wave to test
+    Precondition: wave is a Wave
+    """
+    return (wave.getship() is None or wave.getaliensbelow() or
+            not wave.getaliensleft())
+
+
+class ReplayPlayer(object):
+    """
+    A class to play a replay quickly and seek to any tick of it.
+
+    INSTANCE ATTRIBUTES:
+        _replay:    the replay being played [Replay]
+        _wave:      the wave the replay is played through [Wave]
+        _input:     the keys of the replay [ReplayInput]
+        _tick:      the number of ticks played [int, 0 <= _tick <= len(_replay)]
+        _interval:  the number of ticks between snapshots [int > 0]
+        _snapshots: the state of _wave at every multiple of _interval played so
+                    far [dict from int to the result of Wave.getstate]
+    """
+
+    def getwave(self):
+        """
+        Returns self._wave
+        """
+        return self._wave
+
+    def gettick(self):
+        """
+        Returns self._tick
+        """
+        return self._tick
+
+    def __init__(self, replay, interval=SNAPSHOT_INTERVAL, headless=True):
+        """
+        Initializes a new ReplayPlayer at the first tick of replay.
+
+        Parameter replay: the replay to play
+        Precondition: replay is a Replay
+
+        Parameter interval: the number of ticks between snapshots
+        Precondition: interval is an int > 0
+
+        Parameter headless: True if the wave should be made without a window
+        Precondition: headless is a bool
+        """
+        self._replay = replay
+        self._wave = Wave(headless=headless, rows=replay.getrows(),
+        cols=replay.getcols(), seed=replay.getseed(), **replay.getsettings())
+        self._input = ReplayInput(replay.getkeys())
+        self._tick = 0
+        self._interval = interval
+        self._snapshots = {0: self._wave.getstate()}
+
+    def isdone(self):
+        """
+        Returns True if the replay has run out or the wave is over
+        """
+        return self._tick >= len(self._replay) or waveover(self._wave)
+
+    def advance(self, ticks):
+        """
+        Plays up to ticks more ticks and returns the number played.
+
+        A snapshot is saved at every multiple of the snapshot interval passed
+        on the way. Fewer ticks are played if the replay runs out or the wave
+        ends first.
+
+        Parameter ticks: the most ticks to play
+        Precondition: ticks is an int >= 0
+        """
+        played = 0
+        while played < ticks and not self.isdone():
+            boundary = (self._tick//self._interval + 1)*self._interval
+            chunk = min(ticks - played, boundary - self._tick,
+            len(self._replay) - self._tick)
+            done = playwave(self._wave, self._input, chunk)
+            self._tick += done
+            played += done
+            if self._tick % self._interval == 0:
+                if self._tick not in self._snapshots:
+                    self._snapshots[self._tick] = self._wave.getstate()
+            if done < chunk:
+                break
+        return played
+
+    def seek(self, tick):
+        """
+        Moves the replay to tick, as if exactly tick ticks had been played.
+
+        If tick is before the current tick, or a snapshot closer to tick is
+        saved, the wave is put back to the latest snapshot at or before tick
+        first. The replay then plays forward to tick (or to the end of the wave,
+        if that comes first).
+
+        Parameter tick: the tick to move to
+        Precondition: tick is an int, 0 <= tick <= len(replay)
+        """
+        start = max(t for t in self._snapshots if t <= tick)
+        if tick < self._tick or start > self._tick:
+            self._wave.setstate(self._snapshots[start])
+            self._input.setframe(start)
+            self._tick = start
+        self.advance(tick - self._tick)
+
+
+def play(replay, headless=True):
+    """
+    Returns a new Wave that has been played through all of replay.
+
+    Parameter replay: the replay to play
+    Precondition: replay is a Replay
+
+    Parameter headless: True if the wave should be made without a window
+    Precondition: headless is a bool
+    """
+    wave = Wave(headless=headless, rows=replay.getrows(),
+    cols=replay.getcols(), seed=replay.getseed(), **replay.getsettings())
+    playwave(wave, ReplayInput(replay.getkeys()), len(replay))
+    return wave
+
+
+def main():
+    """
+    Plays the replay named on the command line and prints how the wave stands.
+    """
+    parser = argparse.ArgumentParser(description='Play a replay of a wave '
+    'and show how it stands at a tick.')
+    parser.add_argument('file', help='the replay file')
+    parser.add_argument('--seek', type=int, default=None,
+    help='the tick to stop at (default: the end)')
+    args = parser.parse_args()
+
+    replay = load(args.file)
+    player = ReplayPlayer(replay)
+    player.seek(len(replay) if args.seek is None else
+    max(0, min(args.seek, len(replay))))
+    wave = player.getwave()
+    counts = wave.getobjectcounts()
+    print('tick %d of %d' % (player.gettick(), len(replay)))
+    print('score %d  lives %d  aliens %d  bolts %d' % (wave.getscore(),
+    wave.getlives(), counts['aliens'], counts['bolts']))
+    if waveover(wave):
+        print('the wave is '+('won' if not wave.getaliensleft() else 'lost'))
+
+
+if __name__ == '__main__':
+    main()
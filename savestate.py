@@ -0,0 +1,329 @@
+"""
+Save state module for Alien Invaders
+
+This module turns the state of a game (the state of Invaders and everything in
+its Wave, as returned by Wave.getstate) into a short string of bytes and back.
+Pickling a Wave would drag every GImage, and Kivy with it, into the file; this
+format only stores numbers.  The aliens are stored as a bitmask plus the origin
+of the formation, and the bolts as packed arrays.
+
+A save state is laid out as follows.  All numbers are little-endian.
+
+    4 bytes    the magic number b'SISV'
+    1 byte     the version of the format (SAVE_VERSION)
+    1 byte     the state of Invaders (one of the STATE constants)
+    1 byte     1 if a wave follows, 0 if not
+    the wave, if there is one:
+      WAVE_HEADER  seed, rows, cols, origin x and y, whether the ship is alive,
+                   ship x, ship x at the last tick, lives, score, speed, time,
+                   aliendir, boltsteps, aliensbelow, aliensleft, and the
+                   settings of the wave: alienspeed, boltrate and speedcurve
+      2 bytes      the number of columns with live aliens, then 2 bytes for
+                   each of them, in the order Formation keeps them
+      n bytes      the alive flags of the aliens, 8 to a byte, row by row
+      RNG_HEADER   the version of the random number state and whether it has a
+                   saved gauss value, then that value
+      2500 bytes   the 625 numbers of the random number state
+      4 bytes      the number of bolts, then their x and y coordinates as
+                   doubles and their owners, 8 to a byte
+
+Version 1 save states have no settings in WAVE_HEADER (WAVE_HEADER_V1); they
+are read back with the default settings, which were the only ones then.
+
+Many save states can be kept in one archive file (see write_archive).  An
+Archive reads them back one at a time, and can memory-map the file so that only
+the save states actually used are read from disk.
+"""
+from consts import *
+from wave import SPEED_CURVE
+import mmap
+import numpy
+import struct
+
+# The first four bytes of every save state
+SAVE_MAGIC = b'SISV'
+
+# The first four bytes of every archive of save states
+ARCHIVE_MAGIC = b'SISA'
+
+# The version of the save state and archive formats
+SAVE_VERSION = 2
+
+# The bytes after the magic number of a save state
+SAVE_HEADER = struct.Struct('<BBB')
+
+# The numbers that describe a wave
+WAVE_HEADER = struct.Struct('<QHHddBddBIddBiBBdId')
+
+# The numbers that describe a wave in version 1, which had no settings
+WAVE_HEADER_V1 = struct.Struct('<QHHddBddBIddBiBB')
+
+# The version of a random number state, whether it has a gauss value, and the
+# gauss value
+RNG_HEADER = struct.Struct('<BBd')
+
+# The bytes after the magic number of an archive: the version and the count
+ARCHIVE_HEADER = struct.Struct('<BI')
+
+
+def encode(appstate, wavestate=None):
+    """
+    Returns the save state of a game as bytes
+
+    Parameter appstate: the state of Invaders
+    Precondition: appstate is one of the STATE constants in consts.py
+
+    Parameter wavestate: the state of the wave, or None if there is no wave
+    Precondition: wavestate is None or was returned by Wave.getstate
+    """
+    parts = [SAVE_MAGIC, SAVE_HEADER.pack(SAVE_VERSION, appstate,
+             wavestate is not None)]
+    if wavestate is not None:
+        formation = wavestate['formation']
+        bolts = wavestate['bolts']
+        ship = wavestate['ship']
+        parts.append(WAVE_HEADER.pack(wavestate['seed'], formation['rows'],
+        formation['cols'], formation['origin'][0], formation['origin'][1],
+        ship is not None, 0 if ship is None else ship, wavestate['shipx'],
+        wavestate['lives'], wavestate['score'], wavestate['speed'],
+        wavestate['time'], wavestate['aliendir'], wavestate['boltsteps'],
+        wavestate['aliensbelow'], wavestate['aliensleft'],
+        wavestate['alienspeed'], wavestate['boltrate'],
+        wavestate['speedcurve']))
+
+        occupied = formation['occupied']
+        parts.append(struct.pack('<H', len(occupied)))
+        parts.append(numpy.array(occupied, dtype='<u2').tobytes())
+        parts.append(numpy.packbits(formation['alive']).tobytes())
+
+        version, internal, gauss = wavestate['rng']
+        parts.append(RNG_HEADER.pack(version, gauss is not None,
+        0.0 if gauss is None else gauss))
+        parts.append(numpy.array(internal, dtype='<u4').tobytes())
+
+        parts.append(struct.pack('<I', len(bolts['x'])))
+        parts.append(numpy.asarray(bolts['x'], dtype='<f8').tobytes())
+        parts.append(numpy.asarray(bolts['y'], dtype='<f8').tobytes())
+        parts.append(numpy.packbits(bolts['fromship']).tobytes())
+    return b''.join(parts)
+
+
+def decode(data):
+    """
+    Returns the game saved in data as a tuple (appstate, wavestate)
+
+    wavestate is None if no wave was saved; otherwise it can be given to
+    Wave.setstate.  This function raises a ValueError if data is not a save
+    state, or is from a newer version of the format.
+
+    Parameter data: the save state
+    Precondition: data is a bytes, bytearray, memoryview or mmap
+    """
+    data = memoryview(data)
+    if bytes(data[:len(SAVE_MAGIC)]) != SAVE_MAGIC:
+        raise ValueError('not a save state')
+    pos = len(SAVE_MAGIC)
+    version, appstate, haswave = SAVE_HEADER.unpack_from(data, pos)
+    if version > SAVE_VERSION:
+        raise ValueError('save state is from a newer version ('+str(version)+
+        ')')
+    pos += SAVE_HEADER.size
+    if not haswave:
+        return (appstate, None)
+
+    header = WAVE_HEADER if version >= 2 else WAVE_HEADER_V1
+    values = header.unpack_from(data, pos)
+    pos += header.size
+    (seed, rows, cols, originx, originy, hasship, ship, shipx, lives, score,
+     speed, time, aliendir, boltsteps, aliensbelow, aliensleft) = values[:16]
+    if version >= 2:
+        alienspeed, boltrate, speedcurve = values[16:]
+    else:
+        alienspeed, boltrate, speedcurve = ALIEN_SPEED, BOLT_RATE, SPEED_CURVE
+
+    n = struct.unpack_from('<H', data, pos)[0]
+    pos += 2
+    occupied = numpy.frombuffer(data, dtype='<u2', count=n, offset=pos)
+    pos += 2*n
+    size = (rows*cols + 7)//8
+    alive = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8,
+    count=size, offset=pos), count=rows*cols).astype(bool).reshape(rows, cols)
+    pos += size
+
+    rngversion, hasgauss, gauss = RNG_HEADER.unpack_from(data, pos)
+    pos += RNG_HEADER.size
+    internal = numpy.frombuffer(data, dtype='<u4', count=625, offset=pos)
+    pos += 4*625
+
+    n = struct.unpack_from('<I', data, pos)[0]
+    pos += 4
+    x = numpy.frombuffer(data, dtype='<f8', count=n, offset=pos).copy()
+    pos += 8*n
+    y = numpy.frombuffer(data, dtype='<f8', count=n, offset=pos).copy()
+    pos += 8*n
+    fromship = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8,
+    count=(n + 7)//8, offset=pos), count=n).astype(bool)
+
+    return (appstate, {'seed': seed, 'alienspeed': alienspeed,
+            'boltrate': boltrate, 'speedcurve': speedcurve,
+            'formation': {'rows': rows, 'cols': cols,
+                          'origin': (originx, originy), 'alive': alive,
+                          'occupied': occupied.tolist()},
+            'bolts': {'x': x, 'y': y, 'fromship': fromship,
+                      'velocity': numpy.where(fromship, BOLT_SPEED,
+                                              -BOLT_SPEED).astype(float)},
+            'ship': ship if hasship else None, 'shipx': shipx,
+            'lives': lives, 'score': score, 'speed': speed, 'time': time,
+            'aliendir': aliendir, 'boltsteps': boltsteps,
+            'aliensbelow': bool(aliensbelow), 'aliensleft': bool(aliensleft),
+            'rng': (rngversion, tuple(internal.tolist()),
+                    gauss if hasgauss else None)})
+
+
+def save(path, appstate, wavestate=None):
+    """
+    Writes the save state of a game to the file path.
+
+    Parameter path: the name of the file to write
+    Precondition: path is a str
+
+    Parameter appstate: the state of Invaders
+    Precondition: appstate is one of the STATE constants in consts.py
+
+    Parameter wavestate: the state of the wave, or None if there is no wave
+    Precondition: wavestate is None or was returned by Wave.getstate
+    """
+    with open(path, 'wb') as file:
+        file.write(encode(appstate, wavestate))
+
+
+def load(path):
+    """
+    Returns the game saved in the file path as a tuple (appstate, wavestate)
+
+    See decode for the details.
+
+    Parameter path: the name of the file to read
+    Precondition: path is a str
+    """
+    with open(path, 'rb') as file:
+        return decode(file.read())
+
+
+def write_archive(path, snapshots):
+    """
+    Writes many save states to one archive file.
+
+    The archive starts with ARCHIVE_MAGIC and ARCHIVE_HEADER, then a table of
+    where each save state ends (8 bytes each), then the save states one after
+    the other.
+
+    Parameter path: the name of the file to write
+    Precondition: path is a str
+
+    Parameter snapshots: the save states to write
+    Precondition: snapshots is a sequence of bytes, each returned by encode
+    """
+    ends = numpy.cumsum([len(snapshot) for snapshot in snapshots],
+    dtype='<u8')
+    with open(path, 'wb') as file:
+        file.write(ARCHIVE_MAGIC)
+        file.write(ARCHIVE_HEADER.pack(SAVE_VERSION, len(snapshots)))
+        file.write(ends.tobytes())
+        for snapshot in snapshots:
+            file.write(snapshot)
+
+
+class Archive(object):
+    """
+    A class to read the save states in an archive file.
+
+    The archive can be memory-mapped, in which case nothing but the table at
+    the start is read until a save state is asked for, and then only that save
+    state is read.  Otherwise the whole file is read at once.
+
+    INSTANCE ATTRIBUTES:
+        _file:  the open archive file [file, or None once closed]
+        _data:  the contents of the file [mmap or bytes, or None once closed]
+        _ends:  where each save state ends, counted from _start [numpy array
+                of int]
+        _start: where the first save state begins [int >= 0]
+    """
+
+    def __init__(self, path, usemmap=True):
+        """
+        Opens the archive in the file path.
+
+        This raises a ValueError if the file is not an archive, or is from a
+        newer version of the format.
+
+        Parameter path: the name of the archive file
+        Precondition: path is a str
+
+        Parameter usemmap: True to memory-map the file, False to read it all
+        Precondition: usemmap is a bool
+        """
+        self._data = None
+        self._file = open(path, 'rb')
+        try:
+            if usemmap:
+                self._data = mmap.mmap(self._file.fileno(), 0,
+                access=mmap.ACCESS_READ)
+            else:
+                self._data = self._file.read()
+            if self._data[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+                raise ValueError(path+' is not an archive of save states')
+            pos = len(ARCHIVE_MAGIC)
+            version, count = ARCHIVE_HEADER.unpack_from(self._data, pos)
+            if version > SAVE_VERSION:
+                raise ValueError(path+' is from a newer version ('+
+                str(version)+')')
+            pos += ARCHIVE_HEADER.size
+            self._ends = numpy.frombuffer(self._data[pos:pos+8*count],
+            dtype='<u8').astype(numpy.int64)
+            self._start = pos + 8*count
+        except:
+            self.close()
+            raise
+
+    def __len__(self):
+        """
+        Returns the number of save states in the archive
+        """
+        return len(self._ends)
+
+    def __getitem__(self, i):
+        """
+        Returns save state i of the archive as a tuple (appstate, wavestate)
+
+        See decode for the details.
+
+        Parameter i: the index of the save state
+        Precondition: i is an int, 0 <= i < len(self)
+        """
+        begin = self._start + (int(self._ends[i-1]) if i > 0 else 0)
+        end = self._start + int(self._ends[i])
+        return decode(self._data[begin:end])
+
+    def close(self):
+        """
+        Closes the archive file. The archive cannot be read after this.
+        """
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        """
+        Returns this archive, so it can be used in a with statement
+        """
+        return self
+
+    def __exit__(self, *exception):
+        """
+        Closes the archive at the end of a with statement
+        """
+        self.close()
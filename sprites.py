@@ -0,0 +1,404 @@
+"""
+Sprites module for Alien Invaders
+
+This module contains the class SpriteAtlas, which makes sure that every
+picture in the game is only read from disk and decoded once per process, the
+classes FormationBatch and BoltBatch, which hold all of the aliens and all of
+the bolts in one Mesh each, and the class WaveScene, which keeps everything a
+wave draws on the canvas from one frame to the next.
+
+SpriteAtlas decodes the pictures of the aliens and the ship once and packs
+them side by side into a single texture, the atlas.  Anything that wants to
+draw one of them asks the atlas for its region: a texture that shares the
+pixels of the atlas instead of having its own copy.
+
+Drawing every Alien and Bolt with its own draw call puts one group of canvas
+instructions per object on the canvas every frame.  FormationBatch instead
+draws every live alien as one Mesh of textured squares from the atlas.  The
+aliens never move relative to each other, so the mesh is only built again when
+an alien is shot, and marching just changes a single Translate in front of it.
+BoltBatch draws every bolt as one Mesh too, filling in its vertices from the
+arrays of a BoltBuffer each frame.
+
+WaveScene holds the canvas instructions of a whole wave: the formation, the
+ship, the defense line and the bolts.  They are made once and then only
+changed when Wave says that part of the wave has changed, so an idle formation
+and the defense line, which never changes, are not touched from one frame to
+the next.
+
+There is one atlas per process, made the first time it is asked for by
+getatlas.  This module imports Kivy, so it is only
+imported by wave.py when a wave that is not headless is made.
+"""
+from consts import *
+from kivy.core.image import Image as CoreImage
+from kivy.graphics import (Color, InstructionGroup, Line, Mesh, PopMatrix,
+                           PushMatrix, Rectangle, Translate)
+from kivy.graphics.texture import Texture
+import numpy
+
+# The pictures packed into the atlas
+SPRITE_SOURCES = tuple(ALIEN_IMAGES) + ('ship.png',)
+
+# The pixels left empty between two pictures in the atlas, so that smoothing
+# at the edge of one picture never picks up the next one
+ATLAS_PADDING = 2
+
+# The corners of a square, in the order Mesh and the texture coordinates of the
+# atlas use (bottom left, bottom right, top right, top left), as multiples of
+# half its width and half its height
+QUAD_CORNERS = numpy.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=float)
+
+# The two triangles of a square, as indices of its corners
+QUAD_INDICES = (0, 1, 2, 2, 3, 0)
+
+# The color of the bolts, the same as Bolt
+BOLT_COLOR = (0, 0, 1, 1)
+
+# The color of the defense line, the same as the GPath of the original game
+LINE_COLOR = (0, 0, 0, 1)
+
+# The width of the defense line, the same as the GPath of the original game
+LINE_WIDTH = 2
+
+# The atlas of the process, made by getatlas
+_atlas = None
+
+
+class SpriteAtlas(object):
+    """
+    A class to pack many pictures into one texture.
+
+    The pictures are placed in a single row, left to right in the order they
+    are given, with ATLAS_PADDING pixels between them.
+
+    INSTANCE ATTRIBUTES:
+        _texture: the texture holding every picture [Texture]
+        _regions: the part of _texture holding each picture, by file name
+                  [dict from str to TextureRegion]
+    """
+
+    def gettexture(self):
+        """
+        Returns self._texture
+        """
+        return self._texture
+
+    def __init__(self, sources=SPRITE_SOURCES):
+        """
+        Initializes a new SpriteAtlas holding the pictures in sources.
+
+        Each picture is read and decoded exactly once, here.
+
+        Parameter sources: the file names of the pictures
+        Precondition: sources is a sequence of str, each naming an image file
+        """
+        images = [CoreImage(source).texture for source in sources]
+        width = sum(image.width for image in images)
+        width += ATLAS_PADDING*(len(images)-1)
+        height = max(image.height for image in images)
+        self._texture = Texture.create(size=(width, height), colorfmt='rgba')
+        self._regions = {}
+
+        left = 0
+        for i in range(len(sources)):
+            image = images[i]
+            self._texture.blit_buffer(image.pixels, pos=(left, 0),
+            size=image.size, colorfmt='rgba', bufferfmt='ubyte')
+            # Texture.pixels reads the picture back upright, with its origin at
+            # the bottom left like the atlas, so the region needs no flipping
+            region = self._texture.get_region(left, 0, image.width,
+            image.height)
+            self._regions[sources[i]] = region
+            left += image.width + ATLAS_PADDING
+
+    def getregion(self, source):
+        """
+        Returns the part of the atlas holding the picture source
+
+        Parameter source: the file name of the picture
+        Precondition: source is one of the sources the atlas was made with
+        """
+        return self._regions[source]
+
+    def getuvs(self, source):
+        """
+        Returns the texture coordinates of the picture source in the atlas, as
+        a tuple of eight floats (the corners, starting at the bottom left and
+        going counterclockwise)
+
+        Parameter source: the file name of the picture
+        Precondition: source is one of the sources the atlas was made with
+        """
+        return self._regions[source].tex_coords
+
+
+def quadindices(count):
+    """
+    Returns the indices of the triangles of count squares in a Mesh
+
+    Square i uses vertices 4*i to 4*i+3.
+
+    Parameter count: the number of squares
+    Precondition: count is an int >= 0
+    """
+    return [4*i + corner for i in range(count) for corner in QUAD_INDICES]
+
+
+class FormationBatch(object):
+    """
+    A class to draw every live alien of a Formation with one Mesh.
+
+    The vertices of the mesh are relative to the origin of the formation, and
+    a Translate in front of the mesh moves them to the origin.
+
+    INSTANCE ATTRIBUTES:
+        _sources:   the picture of each row of aliens [list of str]
+        _atlas:     the atlas the pictures come from [SpriteAtlas]
+        _alive:     the alive flags the mesh was last built from, or None if
+                    it has never been built [numpy array of bool or None]
+        _translate: moves the mesh to the origin of the formation [Translate]
+        _mesh:      a textured square for each live alien [Mesh]
+        _group:     everything drawn, in order [InstructionGroup]
+    """
+
+    def __init__(self, sources, atlas):
+        """
+        Initializes a new FormationBatch with no aliens in it yet.
+
+        Parameter sources: the picture of each row of aliens
+        Precondition: sources is a sequence of str, each in the atlas
+
+        Parameter atlas: the atlas holding the pictures
+        Precondition: atlas is a SpriteAtlas
+        """
+        self._sources = list(sources)
+        self._atlas = atlas
+        self._alive = None
+        self._translate = Translate(0, 0)
+        self._mesh = Mesh(vertices=[], indices=[], mode='triangles',
+        texture=atlas.gettexture())
+        self._group = InstructionGroup()
+        self._group.add(Color(1, 1, 1, 1))
+        self._group.add(PushMatrix())
+        self._group.add(self._translate)
+        self._group.add(self._mesh)
+        self._group.add(PopMatrix())
+
+    def getgroup(self):
+        """
+        Returns the instructions that draw the aliens
+        """
+        return self._group
+
+    def update(self, formation):
+        """
+        Moves the mesh to the origin of formation, building it again first if
+        an alien has been shot since it was last built.
+
+        Parameter formation: the aliens to draw
+        Precondition: formation is a Formation with as many rows as there are
+        sources
+        """
+        alive = formation.getalive()
+        if self._alive is None or not numpy.array_equal(alive, self._alive):
+            self._build(formation)
+            self._alive = alive.copy()
+        self._translate.xy = formation.getorigin()
+
+    def _build(self, formation):
+        """
+        Fills the mesh with a square for each live alien of formation.
+
+        Parameter formation: the aliens to draw
+        Precondition: formation is a Formation with as many rows as there are
+        sources
+        """
+        originx, originy = formation.getorigin()
+        vertices = []
+        rows, cols = numpy.nonzero(formation.getalive())
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            x, y = formation.getposition(row, col)
+            uvs = self._atlas.getuvs(self._sources[row])
+            for corner in range(4):
+                vertices.extend((x - originx +
+                QUAD_CORNERS[corner, 0]*ALIEN_WIDTH/2, y - originy +
+                QUAD_CORNERS[corner, 1]*ALIEN_HEIGHT/2, uvs[2*corner],
+                uvs[2*corner+1]))
+        self._mesh.vertices = vertices
+        self._mesh.indices = quadindices(len(rows))
+
+
+class BoltBatch(object):
+    """
+    A class to draw every bolt of a BoltBuffer with one Mesh.
+
+    INSTANCE ATTRIBUTES:
+        _indices: the indices of the triangles of _capacity squares [list of
+                  int]
+        _capacity: the number of squares _indices has room for [int >= 0]
+        _mesh:    a square for each bolt [Mesh]
+        _group:   everything drawn, in order [InstructionGroup]
+    """
+
+    def __init__(self):
+        """
+        Initializes a new BoltBatch with no bolts in it yet.
+        """
+        self._capacity = 0
+        self._indices = []
+        self._mesh = Mesh(vertices=[], indices=[], mode='triangles')
+        self._group = InstructionGroup()
+        self._group.add(Color(*BOLT_COLOR))
+        self._group.add(self._mesh)
+
+    def getgroup(self):
+        """
+        Returns the instructions that draw the bolts
+        """
+        return self._group
+
+    def update(self, bolts, alpha=1):
+        """
+        Fills the mesh with a square for each bolt in bolts.
+
+        A bolt moves by its velocity every tick, so it is put (1-alpha) of a
+        tick behind where it is.
+
+        Parameter bolts: the bolts to draw
+        Precondition: bolts is a BoltBuffer
+
+        Parameter alpha: how far the time being drawn is between the last two
+        ticks
+        Precondition: alpha is a number, 0 <= alpha <= 1
+        """
+        count = bolts.count()
+        if count > self._capacity:
+            self._capacity = max(count, 2*self._capacity)
+            self._indices = quadindices(self._capacity)
+        vertices = numpy.zeros((count, 4, 4))
+        vertices[:, :, 0] = (bolts.getx()[:, None] +
+        QUAD_CORNERS[:, 0]*BOLT_WIDTH/2)
+        vertices[:, :, 1] = ((bolts.gety() -
+        bolts.getvelocity()*(1-alpha))[:, None] +
+        QUAD_CORNERS[:, 1]*BOLT_HEIGHT/2)
+        self._mesh.vertices = vertices.ravel().tolist()
+        self._mesh.indices = self._indices[:6*count]
+
+
+class WaveScene(object):
+    """
+    A class to keep the canvas instructions of a wave from frame to frame.
+
+    The scene is built once, with the defense line in it.  After that, each
+    part is only changed when it is set again, and Wave only sets the parts it
+    has marked as changed.  Drawing the scene adds a single group to the frame
+    of the view.
+
+    INSTANCE ATTRIBUTES:
+        _formation:  draws the aliens [FormationBatch]
+        _bolts:      draws the bolts [BoltBatch]
+        _ship:       draws the ship, centered on (0, 0) [InstructionGroup]
+        _shipmove:   moves _ship to where the ship is [Translate]
+        _shipslot:   holds _ship while the ship is on screen, and is empty
+                     otherwise [InstructionGroup]
+        _shipx:      the x-coordinate the ship is drawn at, or None if it is
+                     not on screen [float or None]
+        _root:       everything drawn, in order [InstructionGroup]
+    """
+
+    def __init__(self, sources, atlas):
+        """
+        Initializes a new WaveScene with no aliens, ship or bolts in it yet.
+
+        Parameter sources: the picture of each row of aliens
+        Precondition: sources is a sequence of str, each in the atlas
+
+        Parameter atlas: the atlas holding the pictures of the aliens and of
+        'ship.png'
+        Precondition: atlas is a SpriteAtlas
+        """
+        self._formation = FormationBatch(sources, atlas)
+        self._bolts = BoltBatch()
+
+        self._shipmove = Translate(0, SHIP_BOTTOM + SHIP_HEIGHT/2)
+        self._ship = InstructionGroup()
+        self._ship.add(Color(1, 1, 1, 1))
+        self._ship.add(PushMatrix())
+        self._ship.add(self._shipmove)
+        self._ship.add(Rectangle(texture=atlas.getregion('ship.png'),
+        pos=(-SHIP_WIDTH/2, -SHIP_HEIGHT/2), size=(SHIP_WIDTH, SHIP_HEIGHT)))
+        self._ship.add(PopMatrix())
+        self._shipslot = InstructionGroup()
+        self._shipx = None
+
+        line = InstructionGroup()
+        line.add(Color(*LINE_COLOR))
+        line.add(Line(points=[0, DEFENSE_LINE, GAME_WIDTH, DEFENSE_LINE],
+        width=LINE_WIDTH))
+
+        self._root = InstructionGroup()
+        self._root.add(self._formation.getgroup())
+        self._root.add(self._shipslot)
+        self._root.add(line)
+        self._root.add(self._bolts.getgroup())
+
+    def setformation(self, formation):
+        """
+        Shows the aliens of formation where they are now.
+
+        Parameter formation: the aliens to draw
+        Precondition: formation is a Formation with as many rows as there are
+        sources
+        """
+        self._formation.update(formation)
+
+    def setship(self, x):
+        """
+        Shows the ship with its center at x, or hides it if x is None.
+
+        Parameter x: the x-coordinate of the center of the ship
+        Precondition: x is an int or float, or None
+        """
+        if x is None:
+            if self._shipx is not None:
+                self._shipslot.clear()
+        else:
+            if self._shipx is None:
+                self._shipslot.add(self._ship)
+            if x != self._shipx:
+                self._shipmove.x = x
+        self._shipx = x
+
+    def setbolts(self, bolts, alpha=1):
+        """
+        Shows the bolts in bolts (see BoltBatch.update).
+
+        Parameter bolts: the bolts to draw
+        Precondition: bolts is a BoltBuffer
+
+        Parameter alpha: how far the time being drawn is between the last two
+        ticks
+        Precondition: alpha is a number, 0 <= alpha <= 1
+        """
+        self._bolts.update(bolts, alpha)
+
+    def draw(self, view):
+        """
+        Draws the scene to view, without changing any of it.
+
+        Parameter view: the view to draw to
+        Precondition: view is a GView
+        """
+        view.draw(self._root)
+
+
+def getatlas():
+    """
+    Returns the atlas of SPRITE_SOURCES for this process, making it the first
+    time it is asked for
+    """
+    global _atlas
+    if _atlas is None:
+        _atlas = SpriteAtlas()
+    return _atlas
@@ -0,0 +1,294 @@
+"""
+States module for Alien Invaders
+
+This module contains the handlers for the states of Invaders, and the table
+HANDLERS that maps each STATE constant in consts.py to its handler.  Invaders
+looks up the handler once, when the state changes, and after that every frame
+simply calls the update and draw methods of the current handler, so the number
+of states has no effect on the cost of a frame.
+
+When the state changes, the exit method of the old handler is called, and then
+the enter method of the new one.  Work that only has to happen once per state,
+such as making a label, making a new Wave or bringing back the ship, is done in
+enter rather than in update.
+
+The handlers keep nothing of their own about the game: everything is kept in
+Invaders, which is passed to each method.  So a single handler can stand for a
+state of any game, and the table can be shared.  To add a state (such as an
+attract mode or playing back a replay), add its constant to consts.py, write a
+handler for it here (or use MessageState if it only shows a message and waits
+for a key), and add it to HANDLERS.
+"""
+from consts import *
+
+
+# PRIMARY RULE: The handlers can only access Invaders via its methods and its
+# attributes input and view
+# The handlers are NOT allowed to access anything in wave.py or models.py,
+# other than the Wave returned by Invaders.getwave
+
+
+class State(object):
+    """
+    A class to stand for a state of Invaders that does nothing.
+
+    Every handler is a subclass of State, and only has to override the methods
+    it needs.  By default the current message of Invaders (if any) is drawn.
+    """
+
+    def enter(self, game):
+        """
+        Does the work needed when game changes to this state.
+
+        Parameter game: the game changing state
+        Precondition: game is an Invaders
+        """
+        pass
+
+    def exit(self, game):
+        """
+        Does the work needed when game changes from this state.
+
+        Parameter game: the game changing state
+        Precondition: game is an Invaders
+        """
+        pass
+
+    def update(self, game, dt):
+        """
+        Animates a single frame of game in this state.
+
+        Parameter game: the game to animate
+        Precondition: game is an Invaders
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        pass
+
+    def draw(self, game):
+        """
+        Draws game in this state to its view.
+
+        Parameter game: the game to draw
+        Precondition: game is an Invaders
+        """
+        text = game.gettext()
+        if text is not None:
+            text.draw(game.view)
+
+
+class MessageState(State):
+    """
+    A class to stand for a state that shows a message and waits for S.
+
+    The label is made (or found again) once, when the state is entered.  While
+    S is held down, the game changes to the next state.
+
+    INSTANCE ATTRIBUTES:
+        _name:     the name the label is kept under in Invaders [str]
+        _message:  the text of the label [str]
+        _keywords: the other attributes of the label [dict]
+        _next:     the state to change to when S is pressed [one of the STATE
+                   constants in consts.py]
+    """
+
+    def getnext(self):
+        """
+        Returns self._next
+        """
+        return self._next
+
+    def __init__(self, name, message, keywords, next):
+        """
+        Initializes a new MessageState.
+
+        Parameter name: the name the label is kept under
+        Precondition: name is a str
+
+        Parameter message: the text of the label
+        Precondition: message is a str
+
+        Parameter keywords: the other attributes of the label (such as
+        font_size and top)
+        Precondition: keywords is a dict of valid GLabel keywords
+
+        Parameter next: the state to change to when S is pressed
+        Precondition: next is one of the STATE constants in consts.py
+        """
+        self._name = name
+        self._message = message
+        self._keywords = keywords
+        self._next = next
+
+    def enter(self, game):
+        """
+        Shows the message of this state.
+
+        Parameter game: the game changing state
+        Precondition: game is an Invaders
+        """
+        game.settext(game.getlabel(self._name, self._message,
+        **self._keywords))
+
+    def update(self, game, dt):
+        """
+        Changes game to the next state if S is held down.
+
+        Parameter game: the game to animate
+        Precondition: game is an Invaders
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        if game.input.is_key_down('s'):
+            game.setstate(self._next)
+
+
+class EndState(MessageState):
+    """
+    A class to stand for a state that ends a wave, won or lost.
+
+    It is a MessageState that also saves the replay of the wave when it is
+    entered.
+    """
+
+    def enter(self, game):
+        """
+        Saves the replay of the wave and shows the message of this state.
+
+        Parameter game: the game changing state
+        Precondition: game is an Invaders
+        """
+        game.savereplay()
+        MessageState.enter(self, game)
+
+
+class NewWaveState(State):
+    """
+    A class to stand for STATE_NEWWAVE.
+
+    The new wave is made when the state is entered, and the game changes to
+    STATE_ACTIVE in the next frame.
+    """
+
+    def enter(self, game):
+        """
+        Makes a new wave for game.
+
+        Parameter game: the game changing state
+        Precondition: game is an Invaders
+        """
+        game.newwave()
+
+    def update(self, game, dt):
+        """
+        Changes game to STATE_ACTIVE.
+
+        Parameter game: the game to animate
+        Precondition: game is an Invaders
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        game.setstate(STATE_ACTIVE)
+
+
+class ContinueState(State):
+    """
+    A class to stand for STATE_CONTINUE.
+
+    The ship is brought back when the state is entered, and the game changes to
+    STATE_ACTIVE in the next frame.  A wave that still has its ship (such as a
+    game saved while it was being played) keeps it where it is.
+    """
+
+    def enter(self, game):
+        """
+        Brings back the ship of the wave of game, if it was destroyed.
+
+        Parameter game: the game changing state
+        Precondition: game is an Invaders
+        """
+        wave = game.getwave()
+        if wave.getship() is None:
+            wave.newship()
+
+    def update(self, game, dt):
+        """
+        Changes game to STATE_ACTIVE.
+
+        Parameter game: the game to animate
+        Precondition: game is an Invaders
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        game.setstate(STATE_ACTIVE)
+
+
+class ActiveState(State):
+    """
+    A class to stand for STATE_ACTIVE, where the wave is played.
+
+    The work of each frame is done by Invaders.activestate and
+    Invaders.drawwave.
+    """
+
+    def enter(self, game):
+        """
+        Starts the clock of game again and shows the score and lives.
+
+        Parameter game: the game changing state
+        Precondition: game is an Invaders
+        """
+        game.setclock(0)
+        game.showscore()
+
+    def update(self, game, dt):
+        """
+        Plays the wave of game for dt seconds.
+
+        Parameter game: the game to animate
+        Precondition: game is an Invaders
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        game.activestate(dt)
+
+    def draw(self, game):
+        """
+        Draws the score, the lives and the wave of game.
+
+        Parameter game: the game to draw
+        Precondition: game is an Invaders
+        """
+        game.gettext().draw(game.view)
+        game.drawwave()
+
+
+# The handler of each state
+HANDLERS = {
+    STATE_INACTIVE: MessageState('start', 'Press S to Play',
+                                 {'font_size': 90, 'right': 680, 'top': 550},
+                                 STATE_NEWWAVE),
+    STATE_NEWWAVE:  NewWaveState(),
+    STATE_ACTIVE:   ActiveState(),
+    STATE_PAUSED:   MessageState('pause', 'Press S to Contine',
+                                 {'font_size': 90, 'x': GAME_WIDTH/2,
+                                  'top': 550},
+                                 STATE_CONTINUE),
+    STATE_CONTINUE: ContinueState(),
+    STATE_COMPLETE: MessageState('complete', 'Press S to Play Again',
+                                 {'font_size': 90, 'right': 680, 'top': 550},
+                                 STATE_NEWWAVE),
+    STATE_WIN:      EndState('win', """Congratulations You Win!
+        Press S to Play Again""", {'font_size': 50, 'x': GAME_WIDTH/2,
+                                   'top': 550},
+                                 STATE_COMPLETE),
+    STATE_LOSE:     EndState('lose', """Better Luck Next Time!
+        Press S to Play Again""", {'font_size': 50, 'x': GAME_WIDTH/2,
+                                   'top': 550},
+                                 STATE_COMPLETE),
+}
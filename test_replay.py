@@ -0,0 +1,205 @@
+"""
+Tests for savestate.py, replay.py and env.py
+
+Each test plays a headless wave, puts it through a save or a replay, and then
+plays the copy on next to the original (or next to a fresh run) with the same
+keys, checking that the two stay the same.  The aliens fire as usual, so the
+random numbers of the wave have to come through the round trip as well.
+"""
+from consts import *
+from env import WaveEnv
+from replay import Replay, ReplayInput, ReplayPlayer, playwave, waveover
+from vecwave import ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE
+from wave import Wave
+import numpy
+import replay
+import savestate
+
+# The keys held down in each tick, as a bitmask of REPLAY_KEYS (which uses the
+# same bits as the actions of WaveEnv)
+TEST_KEYS = bytes(([ACTION_LEFT | ACTION_FIRE]*40 +
+                   [ACTION_RIGHT | ACTION_FIRE]*80 +
+                   [ACTION_LEFT]*40)*40)
+
+# The tick the tests save or seek at
+SPLIT_TICK = 900
+
+
+def samestate(first, second):
+    """
+    Returns True if the wave states first and second are the same
+
+    Parameter first: a wave state
+    Precondition: first was returned by Wave.getstate (or is part of one)
+
+    Parameter second: a wave state
+    Precondition: second was returned by Wave.getstate (or is part of one)
+    """
+    if isinstance(first, dict):
+        return (sorted(first) == sorted(second) and
+                all(samestate(first[key], second[key]) for key in first))
+    if isinstance(first, numpy.ndarray) or isinstance(second, numpy.ndarray):
+        return numpy.array_equal(first, second)
+    return first == second
+
+
+def lockstep(first, second, start, ticks):
+    """
+    Plays first and second on with TEST_KEYS from tick start, checking after
+    every tick that they are the same.
+
+    Parameter first: a wave
+    Precondition: first is a headless Wave
+
+    Parameter second: a wave
+    Precondition: second is a headless Wave
+
+    Parameter start: the tick of TEST_KEYS to start from
+    Precondition: start is an int >= 0
+
+    Parameter ticks: the most ticks to play
+    Precondition: ticks is an int >= 0
+    """
+    one = ReplayInput(TEST_KEYS)
+    two = ReplayInput(TEST_KEYS)
+    one.setframe(start)
+    two.setframe(start)
+    for tick in range(ticks):
+        played = playwave(first, one, 1)
+        assert playwave(second, two, 1) == played
+        assert samestate(first.getstate(), second.getstate()), start + tick
+        if played == 0 or waveover(first):
+            return
+
+
+def test_savestate(tmp_path):
+    """
+    Tests that a wave saved part way through and loaded again plays on the
+    same as the wave it was saved from.
+    """
+    wave = Wave(headless=True, seed=7)
+    playwave(wave, ReplayInput(TEST_KEYS), SPLIT_TICK)
+    assert not waveover(wave)
+
+    path = str(tmp_path / 'test.sav')
+    savestate.save(path, STATE_PAUSED, wave.getstate())
+    appstate, wavestate = savestate.load(path)
+    assert appstate == STATE_PAUSED
+    assert samestate(wavestate, wave.getstate())
+
+    formation = wavestate['formation']
+    copy = Wave(headless=True, rows=formation['rows'],
+                cols=formation['cols'], seed=wavestate['seed'])
+    copy.setstate(wavestate)
+    lockstep(wave, copy, SPLIT_TICK, len(TEST_KEYS))
+
+
+def test_savestate_nowave(tmp_path):
+    """
+    Tests that a save with no wave in it loads as no wave.
+    """
+    path = str(tmp_path / 'test.sav')
+    savestate.save(path, STATE_INACTIVE)
+    assert savestate.load(path) == (STATE_INACTIVE, None)
+
+
+def test_replay(tmp_path):
+    """
+    Tests that a replay saved and loaded again plays out the same as the wave
+    it was recorded from.
+    """
+    wave = Wave(headless=True, seed=11)
+    played = playwave(wave, ReplayInput(TEST_KEYS), len(TEST_KEYS))
+
+    path = str(tmp_path / 'test.replay')
+    Replay(wave.getseed(), TEST_KEYS[:played]).save(path)
+    loaded = replay.load(path)
+    assert loaded.getseed() == wave.getseed()
+    assert loaded.getkeys() == TEST_KEYS[:played]
+
+    player = ReplayPlayer(loaded)
+    player.advance(len(loaded))
+    assert samestate(player.getwave().getstate(), wave.getstate())
+
+
+def test_settings(tmp_path):
+    """
+    Tests that a wave with settings other than the defaults keeps them through
+    a save state and through a replay.
+    """
+    settings = {'alienspeed': 0.25, 'boltrate': 2, 'speedcurve': 0.9}
+    wave = Wave(headless=True, rows=3, cols=6, seed=13, **settings)
+    played = playwave(wave, ReplayInput(TEST_KEYS), SPLIT_TICK)
+
+    path = str(tmp_path / 'test.sav')
+    savestate.save(path, STATE_PAUSED, wave.getstate())
+    wavestate = savestate.load(path)[1]
+    for name in settings:
+        assert wavestate[name] == settings[name]
+    copy = Wave(headless=True, rows=3, cols=6, seed=wavestate['seed'])
+    copy.setstate(wavestate)
+    assert copy.getalienspeed() == settings['alienspeed']
+    lockstep(wave, copy, played, len(TEST_KEYS))
+
+    path = str(tmp_path / 'test.replay')
+    first = Wave(headless=True, rows=3, cols=6, seed=13, **settings)
+    played = playwave(first, ReplayInput(TEST_KEYS), len(TEST_KEYS))
+    Replay(13, TEST_KEYS[:played], 3, 6, **settings).save(path)
+    loaded = replay.load(path)
+    assert loaded.getsettings() == settings
+    assert samestate(replay.play(loaded).getstate(), first.getstate())
+
+
+def test_deathonwin():
+    """
+    Tests that a ship destroyed on the tick the wave is won does not cost a
+    life or come back.
+    """
+    wave = Wave(headless=True, seed=5)
+    state = wave.getstate()
+    state['formation']['alive'][:] = False
+    state['formation']['occupied'] = []
+    state['ship'] = None
+    wave.setstate(state)
+    assert playwave(wave, ReplayInput(TEST_KEYS), len(TEST_KEYS)) == 1
+    assert wave.getlives() == SHIP_LIVES
+    assert wave.getship() is None
+    assert waveover(wave)
+
+
+def test_seek():
+    """
+    Tests that seeking a replay back and forth and playing on from there is
+    the same as playing the wave straight through.
+    """
+    player = ReplayPlayer(Replay(3, TEST_KEYS), interval=200)
+    player.advance(2*SPLIT_TICK)
+    player.seek(SPLIT_TICK)
+    assert player.gettick() == SPLIT_TICK
+
+    wave = Wave(headless=True, seed=3)
+    playwave(wave, ReplayInput(TEST_KEYS), SPLIT_TICK)
+    assert samestate(player.getwave().getstate(), wave.getstate())
+    lockstep(wave, player.getwave(), SPLIT_TICK, SPLIT_TICK)
+
+
+def test_env():
+    """
+    Tests that a WaveEnv started twice from the same seed plays out the same,
+    and the same as playwave with the same keys.
+    """
+    first = WaveEnv()
+    second = WaveEnv()
+    first.reset(seed=5)
+    second.reset(seed=5)
+    wave = Wave(headless=True, seed=5)
+    keys = ReplayInput(TEST_KEYS)
+    for tick in range(len(TEST_KEYS)):
+        one = first.step(TEST_KEYS[tick])
+        two = second.step(TEST_KEYS[tick])
+        playwave(wave, keys, 1)
+        assert one[1:] == two[1:]
+        assert samestate(first.getwave().getstate(), wave.getstate())
+        assert samestate(second.getwave().getstate(), wave.getstate())
+        if one[2]:
+            return
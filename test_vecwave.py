@@ -0,0 +1,131 @@
+"""
+Tests for vecwave.py
+
+Each test plays a VecWave with a single wave next to a headless Wave with the
+same settings, one tick at a time, and checks that they stay the same.  The
+two draw their random numbers from different generators, so most tests turn
+alien fire off (with a bolt rate far longer than the test) to keep them in
+step.  test_alienfire leaves it on, but with a single column of aliens and a
+bolt rate of 1, so the aliens fire from the same place every step in both.
+"""
+from consts import *
+from env import WaveEnv
+from vecwave import VecWave, ACTION_LEFT, ACTION_RIGHT, ACTION_FIRE
+import numpy
+
+# A bolt rate so long that the aliens never fire during a test
+NO_FIRE = 10**9
+
+# The most ticks a test plays
+TEST_TICKS = 40000
+
+
+def script(left, right):
+    """
+    Returns a list of actions that sweeps the ship left for left ticks and then
+    right for right ticks, firing the whole time
+
+    Parameter left: the ticks spent moving left
+    Precondition: left is an int >= 0
+
+    Parameter right: the ticks spent moving right
+    Precondition: right is an int >= 0
+    """
+    return ([ACTION_LEFT | ACTION_FIRE]*left +
+            [ACTION_RIGHT | ACTION_FIRE]*right)
+
+
+def lockstep(actions, **settings):
+    """
+    Plays actions (over and over) in a VecWave and in a WaveEnv until the wave
+    is over, checking after every tick that they are the same, and returns the
+    number of ticks played and whether the wave was won.
+
+    Alien fire is off unless settings has a boltrate.  The steps before the
+    first alien bolt are picked at random, so the Wave is given the same
+    number as the VecWave before the first tick.
+
+    Parameter actions: the action for each tick
+    Precondition: actions is a nonempty list of ints
+
+    Parameter settings: the keywords to make both waves with
+    Precondition: settings are keywords of both Wave and VecWave
+    """
+    settings.setdefault('boltrate', NO_FIRE)
+    vec = VecWave(1, **settings)
+    env = WaveEnv(**settings)
+    obs = env.reset(seed=0)
+    state = env.getwave().getstate()
+    state['boltsteps'] = int(vec._boltsteps[0])
+    env.getwave().setstate(state)
+    for tick in range(TEST_TICKS):
+        action = actions[tick % len(actions)]
+        vobs, vreward, vdone, vinfo = vec.step([action])
+        obs, reward, done, info = env.step(action)
+        assert vreward[0] == reward, tick
+        assert bool(vdone[0]) == done, tick
+        if done:
+            assert bool(vinfo['won'][0]) == info['won']
+            assert vinfo['score'][0] == env.getwave().getscore()
+            return (tick + 1, info['won'])
+
+        assert numpy.array_equal(vobs['alive'][0], obs['alive']), tick
+        assert tuple(vobs['origin'][0]) == tuple(obs['origin']), tick
+        assert vobs['shipx'][0] == obs['shipx'], tick
+        assert vec.getlives()[0] == info['lives'], tick
+
+        shipbolt = numpy.flatnonzero(obs['boltfromship'])
+        assert bool(vobs['boltlive'][0, 0]) == (len(shipbolt) == 1), tick
+        if len(shipbolt) == 1:
+            assert vobs['boltx'][0, 0] == obs['boltx'][shipbolt[0]], tick
+            assert vobs['bolty'][0, 0] == obs['bolty'][shipbolt[0]], tick
+
+        alienbolt = numpy.flatnonzero(~obs['boltfromship'])
+        slots = 1 + numpy.flatnonzero(vobs['boltlive'][0, 1:])
+        assert (sorted(zip(vobs['boltx'][0, slots], vobs['bolty'][0, slots]))
+                == sorted(zip(obs['boltx'][alienbolt],
+                              obs['bolty'][alienbolt]))), tick
+    raise AssertionError('the wave did not end in %d ticks' % TEST_TICKS)
+
+
+def test_sweeping():
+    """
+    Tests a ship sweeping back and forth under the formation.
+    """
+    ticks, won = lockstep(script(40, 80))
+    assert ticks > 1
+
+
+def test_standing():
+    """
+    Tests a ship that stays in the middle and only fires, so the aliens get
+    below the defense line.
+    """
+    ticks, won = lockstep([ACTION_FIRE])
+    assert not won
+
+
+def test_small():
+    """
+    Tests a small, fast formation with a fast speed curve.
+    """
+    lockstep(script(25, 50), rows=2, cols=4, alienspeed=0.2, speedcurve=0.9)
+
+
+def test_alienfire():
+    """
+    Tests a single column of aliens that fires at every step, so the alien
+    bolts spawn, fall and hit the ship in both.
+    """
+    lockstep(script(40, 80), cols=1, boltrate=1)
+
+
+def test_spawn():
+    """
+    Tests that a bolt from the ship starts centered on the top of the ship, the
+    same as in a Wave, and has moved once by the end of the tick.
+    """
+    vec = VecWave(1, boltrate=NO_FIRE)
+    obs = vec.step([ACTION_FIRE])[0]
+    assert obs['boltlive'][0, 0]
+    assert obs['bolty'][0, 0] == SHIP_BOTTOM + SHIP_HEIGHT + BOLT_SPEED
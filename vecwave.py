@@ -0,0 +1,483 @@
+"""
+Vectorized wave module for Alien Invaders
+
+This module contains the class VecWave, which plays many waves at once for
+training bots.  A Wave keeps its aliens, bolts and ship in objects of its own,
+so stepping hundreds of them means hundreds of trips through Python for every
+tick.  A VecWave instead keeps the state of every wave in shared NumPy arrays,
+with one row per wave, and a single call to step advances all of them with a
+fixed number of array operations.
+
+Each wave follows the same rules as Wave.update, in the same order, and loses a
+life and brings the ship straight back the way replay.playwave does.  The only
+difference is the random numbers: all of the waves share one NumPy random
+generator, so a wave in a VecWave does not fire the same bolts as a Wave with
+the same seed.  Without alien bolts the two play out exactly the same.
+
+Each wave has room for a fixed number of bolts.  Slot 0 holds the bolt from the
+ship (there can only be one) and the other slots hold alien bolts.  If every
+alien slot is full when an alien fires, that bolt is not fired.
+"""
+from consts import *
+from headless import overlaps
+from wave import TICK, SPEED_CURVE
+import numpy
+
+# The bits of an action, the same as the bits of replay.keymask
+ACTION_LEFT = 1
+ACTION_RIGHT = 2
+ACTION_FIRE = 4
+
+# The number of alien bolts each wave has room for
+VEC_ALIEN_BOLTS = 16
+
+
+class VecWave(object):
+    """
+    A class to play many waves of Alien Invaders in lockstep.
+
+    Wave i of the batch is row i of every array.  An observation is a
+    dictionary of views of these arrays (see getobservation), so nothing is
+    copied when it is returned.  When a wave is won or lost, step reports it as
+    done and starts it again at once, so every wave is always being played.
+
+    INSTANCE ATTRIBUTES:
+        _count:      the number of waves [int > 0]
+        _rows:       the number of rows of aliens [int > 0]
+        _cols:       the number of aliens in each row [int > 0]
+        _rng:        the random numbers used by every wave
+                     [numpy.random.Generator]
+        _alienspeed: the seconds between alien steps at the start of each wave
+                     [numpy array of float > 0, one per wave]
+        _boltrate:   the most alien steps between alien bolts in each wave
+                     [numpy array of int > 0, one per wave]
+        _speedcurve: the number the seconds between alien steps are multiplied
+                     by for each alien shot [numpy array of float, one per wave]
+        _slotx:      the x offset from the origin of each column [numpy array
+                     of float with _cols entries]
+        _sloty:      the y offset from the origin of each row [numpy array of
+                     float with _rows entries]
+        _alive:      True for each alien that has not been shot [numpy array of
+                     bool, _count x _rows x _cols]
+        _origin:     the center of the alien in row 0, column 0 of each wave
+                     [numpy array of float, _count x 2]
+        _aliendir:   the direction the aliens are marching, 0 for right 1 for
+                     left [numpy array of int, one per wave]
+        _time:       the seconds since the last alien step [numpy array of
+                     float, one per wave]
+        _speed:      the seconds between alien steps [numpy array of float, one
+                     per wave]
+        _boltsteps:  the alien steps until the aliens fire a bolt [numpy array
+                     of int, one per wave]
+        _shipx:      the x-coordinate of the ship [numpy array of float, one per
+                     wave]
+        _shipalive:  True if the ship of each wave is on screen [numpy array of
+                     bool, one per wave]
+        _lives:      the lives left in each wave [numpy array of int, one per
+                     wave]
+        _score:      the score of each wave [numpy array of int, one per wave]
+        _ticks:      the ticks played in each wave [numpy array of int, one per
+                     wave]
+        _boltx:      the x-coordinate of the center of each bolt [numpy array of
+                     float, _count x (VEC_ALIEN_BOLTS+1)]
+        _bolty:      the y-coordinate of the center of each bolt [numpy array of
+                     float, same shape as _boltx]
+        _boltlive:   True for each bolt slot that holds a bolt [numpy array of
+                     bool, same shape as _boltx]
+        _waves:      the index of each wave, kept to save making it every tick
+                     [numpy array of int, 0 to _count-1]
+    """
+
+    def getcount(self):
+        """
+        Returns self._count
+        """
+        return self._count
+
+    def getscore(self):
+        """
+        Returns the score of each wave
+
+        The result is _score itself, not a copy, so it must not be changed by
+        the caller.
+        """
+        return self._score
+
+    def getlives(self):
+        """
+        Returns the lives left in each wave
+
+        The result is _lives itself, not a copy, so it must not be changed by
+        the caller.
+        """
+        return self._lives
+
+    def getobservation(self):
+        """
+        Returns what a bot can see of every wave, as a dictionary of arrays
+
+        The keys are 'alive' (_alive), 'origin' (_origin), 'shipx' (_shipx),
+        'shipalive' (_shipalive), 'boltx' (_boltx), 'bolty' (_bolty) and
+        'boltlive' (_boltlive).  The arrays are not copied: they are changed in
+        place by every call to step, and must not be changed by the caller.
+        """
+        return {'alive': self._alive, 'origin': self._origin,
+                'shipx': self._shipx, 'shipalive': self._shipalive,
+                'boltx': self._boltx, 'bolty': self._bolty,
+                'boltlive': self._boltlive}
+
+    def __init__(self, count, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW, seed=None,
+        alienspeed=ALIEN_SPEED, boltrate=BOLT_RATE, speedcurve=SPEED_CURVE,
+        bolts=VEC_ALIEN_BOLTS):
+        """
+        Initializes count new waves, each at its start.
+
+        The settings alienspeed, boltrate and speedcurve are the same as for
+        Wave.  Each may be a single number for every wave or a sequence with
+        one number per wave.
+
+        Parameter count: the number of waves
+        Precondition: count is an int > 0
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: the number of aliens in each row
+        Precondition: cols is an int > 0
+
+        Parameter seed: the seed for the random numbers, or None to pick one at
+        random
+        Precondition: seed is an int >= 0 or None
+
+        Parameter alienspeed: the seconds between alien steps at the start
+        Precondition: alienspeed is a number > 0, or a sequence of count of them
+
+        Parameter boltrate: the most alien steps between alien bolts
+        Precondition: boltrate is an int > 0, or a sequence of count of them
+
+        Parameter speedcurve: the number the seconds between alien steps are
+        multiplied by for each alien shot
+        Precondition: speedcurve is a number, 0 < speedcurve <= 1, or a
+        sequence of count of them
+
+        Parameter bolts: the number of alien bolts each wave has room for
+        Precondition: bolts is an int > 0
+        """
+        self._count = count
+        self._rows = rows
+        self._cols = cols
+        self._rng = numpy.random.default_rng(seed)
+        self._alienspeed = numpy.broadcast_to(numpy.asarray(alienspeed,
+        dtype=float), (count,)).copy()
+        self._boltrate = numpy.broadcast_to(numpy.asarray(boltrate,
+        dtype=numpy.int64), (count,)).copy()
+        self._speedcurve = numpy.broadcast_to(numpy.asarray(speedcurve,
+        dtype=float), (count,)).copy()
+
+        self._slotx = numpy.arange(cols)*float(ALIEN_H_SEP+ALIEN_WIDTH)
+        self._sloty = numpy.arange(rows)*-float(ALIEN_V_SEP+ALIEN_HEIGHT)
+        self._alive = numpy.ones((count, rows, cols), dtype=bool)
+        self._origin = numpy.zeros((count, 2))
+        self._aliendir = numpy.zeros(count, dtype=numpy.int8)
+        self._time = numpy.zeros(count)
+        self._speed = numpy.zeros(count)
+        self._boltsteps = numpy.zeros(count, dtype=numpy.int64)
+        self._shipx = numpy.zeros(count)
+        self._shipalive = numpy.zeros(count, dtype=bool)
+        self._lives = numpy.zeros(count, dtype=numpy.int64)
+        self._score = numpy.zeros(count, dtype=numpy.int64)
+        self._ticks = numpy.zeros(count, dtype=numpy.int64)
+        self._boltx = numpy.zeros((count, bolts+1))
+        self._bolty = numpy.zeros((count, bolts+1))
+        self._boltlive = numpy.zeros((count, bolts+1), dtype=bool)
+        self._waves = numpy.arange(count)
+        self.reset()
+
+    def reset(self, which=None):
+        """
+        Starts waves again from the beginning, and returns the observation
+        (see getobservation).
+
+        Parameter which: the waves to start again, or None for all of them
+        Precondition: which is None, or a numpy array of bool with one entry
+        per wave, or a sequence of wave indices
+        """
+        if which is None:
+            which = slice(None)
+        n = len(self._waves[which])
+        self._alive[which] = True
+        self._origin[which] = (ALIEN_H_SEP + ALIEN_WIDTH/2,
+                               GAME_HEIGHT - ALIEN_CEILING - ALIEN_HEIGHT/2)
+        self._aliendir[which] = 0
+        self._time[which] = 0
+        self._speed[which] = self._alienspeed[which]
+        self._boltsteps[which] = self._rng.integers(0,
+        self._boltrate[which] + 1, size=n)
+        self._shipx[which] = GAME_WIDTH/2
+        self._shipalive[which] = True
+        self._lives[which] = SHIP_LIVES
+        self._score[which] = 0
+        self._ticks[which] = 0
+        self._boltlive[which] = False
+        return self.getobservation()
+
+    def step(self, actions, dt=TICK):
+        """
+        Advances every wave by one tick, and returns a tuple (observation,
+        reward, done, info).
+
+        The observation is the one from getobservation.  reward is the points
+        each wave scored in this tick, and done is True for each wave that was
+        won or lost in this tick.  info is a dictionary with the arrays 'won'
+        (True for each wave that was won in this tick), 'score' (the final
+        score of each wave that is done) and 'ticks' (the ticks played in each
+        wave that is done).  The waves that are done have already been started
+        again, so their observation is of the new wave.
+
+        Parameter actions: the keys held down in each wave, as a bitmask of
+        ACTION_LEFT, ACTION_RIGHT and ACTION_FIRE
+        Precondition: actions is a sequence of count ints (or a numpy array)
+
+        Parameter dt: The time in seconds of the tick
+        Precondition: dt is a number (int or float) > 0
+        """
+        actions = numpy.asarray(actions)
+        before = self._score.copy()
+        self._ticks += 1
+        self._shipmove(actions)
+        self._alienmarch(dt)
+        self._shipfire(actions)
+        self._alienfire()
+        self._boltmove()
+        self._aliencollide()
+        self._shipcollide()
+
+        colalive = self._alive.any(axis=1)
+        count = self._alive.sum(axis=(1, 2))
+        below = self._extent(colalive)[2] <= DEFENSE_LINE
+        killed = self._rows*self._cols - count
+        self._speed[:] = self._alienspeed*self._speedcurve**killed
+
+        won = count == 0
+        over = won | below
+        dead = ~self._shipalive & (self._lives >= 1) & ~over
+        self._lives -= dead
+        respawn = dead & (self._lives > 0)
+        self._shipalive |= respawn
+        self._shipx[respawn] = GAME_WIDTH/2
+
+        done = over | (self._lives == 0)
+        reward = self._score - before
+        info = {'won': won & done, 'score': numpy.where(done, self._score, 0),
+                'ticks': numpy.where(done, self._ticks, 0)}
+        if done.any():
+            self.reset(done)
+        return (self.getobservation(), reward, done, info)
+
+    def _extent(self, colalive):
+        """
+        Returns the edges of the live aliens in each wave as a tuple of arrays
+        (left, right, bottom)
+
+        As in Formation.extent, the edges of a wave with no aliens left are
+        GAME_WIDTH, 0 and GAME_HEIGHT.
+
+        Parameter colalive: True for each column of each wave with a live alien
+        Precondition: colalive is a numpy array of bool, _count x _cols, equal
+        to _alive.any(axis=1)
+        """
+        rowalive = self._alive.any(axis=2)
+        empty = ~colalive.any(axis=1)
+        first = numpy.argmax(colalive, axis=1)
+        last = self._cols - 1 - numpy.argmax(colalive[:, ::-1], axis=1)
+        lowest = self._rows - 1 - numpy.argmax(rowalive[:, ::-1], axis=1)
+        originx = self._origin[:, 0]
+        originy = self._origin[:, 1]
+        left = originx + (self._slotx[first] - ALIEN_WIDTH/2)
+        right = originx + (self._slotx[last] + ALIEN_WIDTH/2)
+        bottom = originy + (self._sloty[lowest] - ALIEN_HEIGHT/2)
+        left[empty] = GAME_WIDTH
+        right[empty] = 0
+        bottom[empty] = GAME_HEIGHT
+        return (left, right, bottom)
+
+    def _shipmove(self, actions):
+        """
+        Moves each ship SHIP_MOVEMENT pixels left and/or right, as Wave.shipmove
+        does, without moving it off screen.
+
+        Parameter actions: the keys held down in each wave
+        Precondition: actions is a numpy array of count ints
+        """
+        x = self._shipx
+        left = (self._shipalive & (actions & ACTION_LEFT != 0) &
+                (x - SHIP_WIDTH/2 > 0))
+        x[left] -= SHIP_MOVEMENT
+        right = (self._shipalive & (actions & ACTION_RIGHT != 0) &
+                 (x + SHIP_WIDTH/2 < GAME_WIDTH))
+        x[right] += SHIP_MOVEMENT
+
+    def _alienmarch(self, dt):
+        """
+        Steps the aliens of each wave that is due to step, as Wave.alienmarch
+        does.
+
+        Parameter dt: The time in seconds of the tick
+        Precondition: dt is a number (int or float) > 0
+        """
+        self._time += dt
+        stepping = self._time >= self._speed
+        if not stepping.any():
+            return
+        left, right = self._extent(self._alive.any(axis=1))[:2]
+        atright = stepping & (right > GAME_WIDTH - ALIEN_H_SEP)
+        atleft = stepping & ~atright & (left < ALIEN_H_SEP)
+        across = stepping & ~atright & ~atleft
+
+        originx = self._origin[:, 0]
+        originy = self._origin[:, 1]
+        originx[atright] -= ALIEN_H_WALK
+        originx[atleft] += ALIEN_H_WALK
+        originy[atright | atleft] -= ALIEN_V_WALK
+        self._aliendir[atright] = 1
+        self._aliendir[atleft] = 0
+        originx[across & (self._aliendir == 0)] += ALIEN_H_WALK
+        originx[across & (self._aliendir == 1)] -= ALIEN_H_WALK
+        self._time[stepping] = 0
+        self._boltsteps[stepping] -= 1
+
+    def _shipfire(self, actions):
+        """
+        Fires a bolt from each ship that wants to fire and does not already
+        have a bolt on screen.
+
+        Parameter actions: the keys held down in each wave
+        Precondition: actions is a numpy array of count ints
+        """
+        fire = (self._shipalive & (actions & ACTION_FIRE != 0) &
+                ~self._boltlive[:, 0])
+        self._boltx[fire, 0] = self._shipx[fire]
+        self._bolty[fire, 0] = SHIP_BOTTOM + SHIP_HEIGHT
+        self._boltlive[fire, 0] = True
+
+    def _alienfire(self):
+        """
+        Fires a bolt from a random column of each wave whose aliens are due to
+        fire, as Wave.alienfire does.
+
+        The bolt comes from the lowest alien of the column, with its center
+        half a bolt below the bottom of the alien, and goes in the first free
+        alien slot.
+        """
+        colalive = self._alive.any(axis=1)
+        fire = numpy.flatnonzero((self._boltsteps == 0) & colalive.any(axis=1))
+        if len(fire) == 0:
+            return
+        colalive = colalive[fire]
+        occupied = colalive.sum(axis=1)
+        pick = (self._rng.random(len(fire))*occupied).astype(numpy.int64)
+        col = numpy.argmax(numpy.cumsum(colalive, axis=1) > pick[:, None],
+        axis=1)
+        column = self._alive[fire, :, col]
+        row = self._rows - 1 - numpy.argmax(column[:, ::-1], axis=1)
+
+        free = ~self._boltlive[fire, 1:]
+        slot = 1 + numpy.argmax(free, axis=1)
+        room = free.any(axis=1)
+        wave = fire[room]
+        slot = slot[room]
+        self._boltx[wave, slot] = self._origin[wave, 0] + self._slotx[col[room]]
+        self._bolty[wave, slot] = (self._origin[wave, 1] +
+        self._sloty[row[room]] - ALIEN_HEIGHT/2 - BOLT_HEIGHT/2)
+        self._boltlive[wave, slot] = True
+        self._boltsteps[fire] = self._rng.integers(1,
+        self._boltrate[fire] + 1)
+
+    def _boltmove(self):
+        """
+        Moves every bolt by its velocity and removes the ones that are off
+        screen, as BoltBuffer.move does.
+        """
+        y = self._bolty
+        y[:, 0] += BOLT_SPEED
+        y[:, 1:] -= BOLT_SPEED
+        self._boltlive &= (y <= GAME_HEIGHT + BOLT_HEIGHT/2) & (y >=
+        -BOLT_HEIGHT/2)
+
+    def _aliencollide(self):
+        """
+        Removes the bolt from each ship and the alien it hit, if it hit one, and
+        adds 100 to the score, as Wave.aliencollide does.
+
+        As in Formation.hit, only the grid cells the bolt falls in are tested,
+        and the alien in the top row (and then the left column) is the one hit.
+        """
+        waves = numpy.flatnonzero(self._boltlive[:, 0])
+        if len(waves) == 0:
+            return
+        pitchx = float(ALIEN_H_SEP+ALIEN_WIDTH)
+        pitchy = float(ALIEN_V_SEP+ALIEN_HEIGHT)
+        originx = self._origin[waves, 0]
+        originy = self._origin[waves, 1]
+        x = self._boltx[waves, 0]
+        y = self._bolty[waves, 0]
+        left = x - BOLT_WIDTH/2
+        right = x + BOLT_WIDTH/2
+        bottom = y - BOLT_HEIGHT/2
+        top = y + BOLT_HEIGHT/2
+
+        cellleft = originx - ALIEN_WIDTH/2
+        celltop = originy + ALIEN_HEIGHT/2
+        firstcol = numpy.maximum(numpy.floor((left - cellleft)/pitchx), 0)
+        lastcol = numpy.minimum(numpy.floor((right - cellleft)/pitchx),
+        self._cols-1)
+        firstrow = numpy.maximum(numpy.floor((celltop - top)/pitchy), 0)
+        lastrow = numpy.minimum(numpy.floor((celltop - bottom)/pitchy),
+        self._rows-1)
+
+        hitrow = numpy.full(len(waves), -1)
+        hitcol = numpy.full(len(waves), -1)
+        for dr in range(int(BOLT_HEIGHT//pitchy) + 2):
+            row = firstrow + dr
+            rowy = originy - row*pitchy
+            for dc in range(int(BOLT_WIDTH//pitchx) + 2):
+                col = firstcol + dc
+                colx = originx + col*pitchx
+                ok = ((row <= lastrow) & (col <= lastcol) & (hitrow < 0) &
+                      overlaps(colx - ALIEN_WIDTH/2, rowy - ALIEN_HEIGHT/2,
+                      colx + ALIEN_WIDTH/2, rowy + ALIEN_HEIGHT/2, left,
+                      bottom, right, top))
+                r = numpy.clip(row, 0, self._rows-1).astype(numpy.int64)
+                c = numpy.clip(col, 0, self._cols-1).astype(numpy.int64)
+                ok &= self._alive[waves, r, c]
+                hitrow[ok] = r[ok]
+                hitcol[ok] = c[ok]
+
+        hit = hitrow >= 0
+        wave = waves[hit]
+        self._alive[wave, hitrow[hit], hitcol[hit]] = False
+        self._boltlive[wave, 0] = False
+        self._score[wave] += 100
+
+    def _shipcollide(self):
+        """
+        Removes each ship hit by an alien bolt, and the first bolt that hit it,
+        as Wave.shipcollide does.
+        """
+        x = self._boltx[:, 1:]
+        y = self._bolty[:, 1:]
+        shipx = self._shipx[:, None]
+        # The center of a bolt inside the ship grown by half a bolt, the same
+        # test as BoltBuffer.hit
+        near = (self._boltlive[:, 1:] & self._shipalive[:, None] &
+                overlaps(shipx - SHIP_WIDTH/2 - BOLT_WIDTH/2,
+                SHIP_BOTTOM - BOLT_HEIGHT/2,
+                shipx + SHIP_WIDTH/2 + BOLT_WIDTH/2,
+                SHIP_BOTTOM + SHIP_HEIGHT + BOLT_HEIGHT/2, x, y, x, y))
+        hit = near.any(axis=1)
+        if not hit.any():
+            return
+        wave = numpy.flatnonzero(hit)
+        slot = 1 + numpy.argmax(near[wave], axis=1)
+        self._boltlive[wave, slot] = False
+        self._shipalive[wave] = False
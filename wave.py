@@ -15,12 +15,49 @@ complicated issue.  If you do not know, ask on Piazza and we will answer.
 # Nick Veszelovits  nav7
 # 12/6/2018
 """
-from game2d import *
 from consts import *
-from models import *
-import app
+from headless import *
+from formation import Formation
+from bolts import BoltBuffer
+from profiler import Profiler
 import random
-import time
+
+# The length in seconds of one simulation tick (one call to Wave.update)
+TICK = 1/60
+
+# The number _speed is multiplied by for each alien shot, so that the aliens
+# march faster as there are fewer of them
+SPEED_CURVE = 0.97
+
+def loadsprites():
+    """
+    Returns the module sprites, importing it the first time it is needed.
+
+    sprites.py imports Kivy, which takes far longer than everything else in a
+    wave.  So this module does not import sprites until a wave that is not
+    headless is made, and headless waves never import it at all.
+
+    This raises an ImportError if Kivy is not installed.
+    """
+    import sprites
+    return sprites
+
+
+def alienimage(row, rows):
+    """
+    Returns the picture of the aliens in row of a formation with rows rows
+
+    The bottom two rows use the first picture in ALIEN_IMAGES, the two above
+    them the second, and so on, starting over when the pictures run out.
+
+    Parameter row: the row of the aliens (0 is the top row)
+    Precondition: row is an int, 0 <= row < rows
+
+    Parameter rows: the number of rows in the formation
+    Precondition: rows is an int > 0
+    """
+    return ALIEN_IMAGES[((rows - 1 - row)//2) % len(ALIEN_IMAGES)]
+
 
 # PRIMARY RULE: Wave can only access attributes in models.py via getters/setters
 # Wave is NOT allowed to access anything in app.py (Subcontrollers are not
@@ -46,12 +83,9 @@ class Wave(object):
 
     #UPDATE ME LATER
     INSTANCE ATTRIBUTES:
-        _ship:   the player ship to control [Ship]
-        _aliens: the 2d list of aliens in the wave [rectangular 2d list of Alien
-                 or None]
-        _bolts:  the laser bolts currently on screen [list of Bolt, possibly
+        _ship:   the player ship to control [HeadlessShip]
+        _bolts:  the laser bolts currently on screen [BoltBuffer, possibly
                  empty]
-        _dline:  the defensive line being protected [GPath]
         _lives:  the number of lives left  [int >= 0]
         _time:   The amount of time since the last Alien "step" [number >= 0]
 
@@ -71,12 +105,33 @@ class Wave(object):
         _aliendir: the direction the aliens are marching, 0 for right 1 for left
                    [int >=0, <=1]
         _boltsteps: number of alien steps till they fire a bolt [int >=0,
-                    <=BOLT_RATE]
+                    <=_boltrate]
         _aliensbelow: True if an alien get below the defense line, False
                      otherwise [bool]
         _noaliens: True if all aliens are shot, False otherwise [bool]
         _score: Score of Game. Increases by 100 for each alien shot. [int >=0]
-        _speed: How many seconds between alien steps [0 < float <= 1]
+        _speed: How many seconds between alien steps [0 < float <=
+                _alienspeed]
+        _alienspeed: the seconds between alien steps when no alien has been
+                     shot [float > 0]
+        _boltrate: the most alien steps between alien bolts [int > 0]
+        _speedcurve: the number _speed is multiplied by for each alien shot
+                     [0 < float <= 1]
+        _headless: True if the wave is played without a window [bool]
+        _scene: the canvas instructions of the wave, kept from frame to frame
+                [WaveScene, or None if the wave is headless]
+        _dirty: the parts of the wave that have changed since they were last
+                drawn [set of 'formation', 'ship' and 'bolts']
+        _formation: the aliens in the wave: where they are and which of
+                    them are alive [Formation]
+        _seed: the seed of _rng [int >= 0]
+        _rng: the random numbers used by this wave, so that a wave played with
+              the same seed and the same keys always plays out the same
+              [random.Random]
+        _shipx: the x-coordinate of the ship at the start of the last update,
+                used to draw it between ticks [int or float]
+        _profiler: the time spent in each phase of recent updates [Profiler,
+                   switched off unless profiling is turned on]
             """
 
     # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
@@ -106,7 +161,7 @@ class Wave(object):
         Sets self._ship to value
 
         Parameter value: the value self._ship is set to
-        Precondition: value is a Ship object
+        Precondition: value is a HeadlessShip object (or None)
         """
         self._ship = value
 
@@ -137,36 +192,201 @@ class Wave(object):
         """
         self._score = value
 
-    def __init__(self):
+    def getalienspeed(self):
+        """
+        Returns self._alienspeed
+        """
+        return self._alienspeed
+
+    def getboltrate(self):
+        """
+        Returns self._boltrate
+        """
+        return self._boltrate
+
+    def getspeedcurve(self):
+        """
+        Returns self._speedcurve
+        """
+        return self._speedcurve
+
+    def getformation(self):
+        """
+        Returns self._formation
+        """
+        return self._formation
+
+    def getbolts(self):
+        """
+        Returns self._bolts
+        """
+        return self._bolts
+
+    def getprofiler(self):
+        """
+        Returns self._profiler
+        """
+        return self._profiler
+
+    def setprofiling(self, value):
+        """
+        Turns the recording of update times in self._profiler on or off
+
+        Parameter value: True to record update times, False to stop
+        Precondition: value is a bool
+        """
+        self._profiler.setenabled(value)
+
+    def getobjectcounts(self):
+        """
+        Returns the number of live aliens and bolts as a dictionary with the
+        keys 'aliens' and 'bolts'
+        """
+        return {'aliens': self._formation.count(),
+                'bolts': self._bolts.count()}
+
+    def getboltstats(self):
+        """
+        Returns the statistics of the bolt buffer (see BoltBuffer.getstats)
+        """
+        return self._bolts.getstats()
+
+    def getseed(self):
         """
-        Initializes a new Wave object. This function call self.createaliens()
-        to create a series of Alien objects to fill self._aliens. It sets all
-        the attributes of Wave objects to their initial values
+        Returns self._seed
         """
+        return self._seed
 
-        self._ship = Ship(x=GAME_WIDTH/2, bottom=SHIP_BOTTOM,
-        height=SHIP_HEIGHT, width=SHIP_WIDTH, source='ship.png')
-        self._dline = GPath(points=[0,DEFENSE_LINE,GAME_WIDTH,DEFENSE_LINE],
-        linewidth=2, linecolor='black')
+    def __init__(self, headless=False, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW,
+        seed=None, alienspeed=ALIEN_SPEED, boltrate=BOLT_RATE,
+        speedcurve=SPEED_CURVE):
+        """
+        Initializes a new Wave object. The aliens are kept in a Formation,
+        which is drawn by the WaveScene of the wave (see sprites.py). It sets
+        all the attributes of Wave objects to their initial values
+
+        A headless wave has no WaveScene, so it can be played without Kivy or
+        a window.  Otherwise sprites.py is imported by this call if it was not
+        already (see loadsprites).
+
+        Parameter headless: True if the wave is played without a window
+        Precondition: headless is a bool
+
+        Parameter rows: the number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: the number of aliens in each row
+        Precondition: cols is an int > 0
+
+        Parameter seed: the seed for the random numbers of this wave, or None
+        to pick one at random
+        Precondition: seed is an int >= 0 or None
+
+        Parameter alienspeed: the seconds between alien steps at the start
+        Precondition: alienspeed is a number (int or float) > 0
+
+        Parameter boltrate: the most alien steps between alien bolts
+        Precondition: boltrate is an int > 0
+
+        Parameter speedcurve: the number the seconds between alien steps are
+        multiplied by for each alien shot
+        Precondition: speedcurve is a number (int or float), 0 < speedcurve <= 1
+        """
+        if seed is None:
+            seed = random.getrandbits(32)
+        self._seed = seed
+        self._rng = random.Random(seed)
+        self._alienspeed = alienspeed
+        self._boltrate = boltrate
+        self._speedcurve = speedcurve
+        self._headless = headless
+        if headless:
+            self._scene = None
+        else:
+            sprites = loadsprites()
+            self._scene = sprites.WaveScene([alienimage(row, rows)
+            for row in range(rows)], sprites.getatlas())
+
+        self._dirty = set(('formation', 'ship', 'bolts'))
+        self.newship()
         self._time = 0
         self._lives = SHIP_LIVES
         self._aliendir = 0
-        self._bolts = []
-        self._boltsteps = random.randint(0, BOLT_RATE)
+        self._bolts = BoltBuffer()
+        self._profiler = Profiler()
+        self._boltsteps = self._rng.randint(0, boltrate)
         self._aliensbelow = False
         self._aliensleft = True
         self._score = 0
-        self._speed = ALIEN_SPEED
-        self._aliens = []
-        self.createaliens()
+        self._speed = alienspeed
+        self._formation = Formation(rows, cols)
+
+    def getstate(self):
+        """
+        Returns everything needed to put this wave back as it is now, as a
+        dictionary.
+
+        The dictionary only holds numbers, strings, tuples, lists, dictionaries
+        and numpy arrays (no GObjects), and nothing in it is shared with the
+        wave, so it can be kept while the wave plays on. The keys are 'seed',
+        'alienspeed', 'boltrate', 'speedcurve', 'formation', 'bolts', 'ship'
+        (the x-coordinate of the ship, or None if it is destroyed), 'shipx',
+        'lives', 'score', 'speed', 'time', 'aliendir', 'boltsteps',
+        'aliensbelow', 'aliensleft' and 'rng' (the state of _rng).
+        """
+        return {'seed': self._seed, 'alienspeed': self._alienspeed,
+                'boltrate': self._boltrate, 'speedcurve': self._speedcurve,
+                'formation': self._formation.getstate(),
+                'bolts': self._bolts.getstate(),
+                'ship': None if self._ship is None else self._ship.getx(),
+                'shipx': self._shipx, 'lives': self._lives,
+                'score': self._score, 'speed': self._speed,
+                'time': self._time, 'aliendir': self._aliendir,
+                'boltsteps': self._boltsteps,
+                'aliensbelow': self._aliensbelow,
+                'aliensleft': self._aliensleft,
+                'rng': self._rng.getstate()}
+
+    def setstate(self, state):
+        """
+        Puts this wave back into state.
+
+        The ship is made again if it is alive in state.
+
+        Parameter state: the state to put the wave in
+        Precondition: state was returned by getstate of a Wave with the same
+        number of rows and columns
+        """
+        self._seed = state['seed']
+        self._alienspeed = state['alienspeed']
+        self._boltrate = state['boltrate']
+        self._speedcurve = state['speedcurve']
+        self._formation.setstate(state['formation'])
+        self._bolts.setstate(state['bolts'])
+        if state['ship'] is None:
+            self._ship = None
+        else:
+            self.newship()
+            self._ship.setx(state['ship'])
+        self._shipx = state['shipx']
+        self._lives = state['lives']
+        self._score = state['score']
+        self._speed = state['speed']
+        self._time = state['time']
+        self._aliendir = state['aliendir']
+        self._boltsteps = state['boltsteps']
+        self._aliensbelow = state['aliensbelow']
+        self._aliensleft = state['aliensleft']
+        self._rng.setstate(state['rng'])
+
+        self._dirty.update(('formation', 'ship', 'bolts'))
 
     def update(self, input, dt):
         """
         This function calls on a variety of helper functions to update many
         factors in the game including alien movement, ship movement, and bolts.
-        This function also increases the _time attribute by dt every time it
-        is called finds the right and left most coordinate of an alien on
-        screen.
+        The time taken by each phase is recorded in _profiler (if it is on),
+        with the phases numbered as in profiler.PROFILE_PHASES.
 
         Parameter input: The current input recived by the PC
         Precondition: input is an instance of GInput
@@ -175,84 +395,107 @@ class Wave(object):
         Precondition: dt is a number int or float
 
         """
+        profiler = self._profiler
+        profiler.start()
+        if self._ship is not None:
+            self._shipx = self._ship.getx()
         self.shipmove(input)
-        self._time += dt
-
-        hirite = 0
-        hileft = GAME_WIDTH
-        for row in self._aliens:
-            for alien in row:
-                if alien is not None:
-                    r = alien.getright()
-                    l = alien.getleft()
-                    if r > hirite:
-                        hirite = r
-                    if l < hileft:
-                        hileft = l
-        if (hirite > GAME_WIDTH - ALIEN_H_SEP) and (self._time >= self._speed):
-            self.alienmovedownatright()
-        elif (hileft < ALIEN_H_SEP) and (self._time >= self._speed):
-            self.alienmovedownatleft()
-        elif self._time >= self._speed:
-            self.alienmove()
-
+        profiler.lap(0)
+        self.alienmarch(dt)
+        profiler.lap(1)
         self.shipfire(input)
         self.alienfire()
+        profiler.lap(2)
         self.boltmove()
+        profiler.lap(3)
         self.aliencollide()
         self.shipcollide()
+        profiler.lap(4)
         self.alienbelowtest()
+        profiler.lap(5)
         self.alientracker()
-
-    def draw(self, view):
-        """
-        This methods draws all instances of Alien, Ship, and Bolt if they are
-        not None, using the draw method inherited from GImage. The defense line
-        is drawn the same way.
-        """
-        for row in self._aliens:
-            for alien in row:
-                if alien is not None:
-                    alien.draw(view)
-        if self._ship is not None:
-            self._ship.draw(view)
-
-
-        self._dline.draw(view)
-
-        for bolts in self._bolts:
-            bolts.draw(view)
+        profiler.lap(6)
+        profiler.stop()
+
+    def draw(self, view, alpha=1, refresh=True):
+        """
+        This method draws the wave to view.
+
+        Everything the wave draws is kept in _scene, and only the parts of the
+        scene named in _dirty are changed. The aliens only change when they
+        step or one is shot. The ship and bolts stay dirty while they are
+        moving, because they are drawn at a new place between ticks every
+        frame. A headless wave has no scene, so it draws nothing.
+
+        The ship and bolts move a little every tick, so they are drawn part of
+        the way (alpha) from where they were at the last tick to where they are
+        now. The aliens jump a whole step at a time, so they are drawn where
+        they are.
+
+        If refresh is False, the scene is drawn as it was last time, without
+        bringing any of it up to date; the dirty parts are kept for the next
+        frame that refreshes.
+
+        Parameter view: the view to draw to
+        Precondition: view is a GView
+
+        Parameter alpha: how far the time being drawn is between the last two
+        ticks
+        Precondition: alpha is a number, 0 <= alpha <= 1
+
+        Parameter refresh: True to bring the scene up to date before drawing it
+        Precondition: refresh is a bool
+        """
+        if self._scene is None:
+            return
+        if refresh:
+            self.drawscene(view, alpha)
+        else:
+            self._scene.draw(view)
+
+    def drawscene(self, view, alpha=1):
+        """
+        This method brings the parts of _scene named in _dirty up to date, and
+        then draws _scene.
+
+        Afterwards the ship is left dirty if it moved in the last tick, and the
+        bolts if there are any, so they are moved on again in the next frame.
+
+        Parameter alpha: how far the time being drawn is between the last two
+        ticks
+        Precondition: alpha is a number, 0 <= alpha <= 1
+        """
+        dirty = self._dirty
+        if 'formation' in dirty:
+            self._scene.setformation(self._formation)
+        if 'ship' in dirty:
+            if self._ship is None:
+                self._scene.setship(None)
+            else:
+                x = self._ship.getx()
+                self._scene.setship(self._shipx + (x - self._shipx)*alpha)
+        if 'bolts' in dirty:
+            self._scene.setbolts(self._bolts, alpha)
+        dirty.clear()
+
+        if self._ship is not None and self._ship.getx() != self._shipx:
+            dirty.add('ship')
+        if self._bolts.count() > 0:
+            dirty.add('bolts')
+        self._scene.draw(view)
 
     def newship(self):
         """
-        This method creates a new Ship object and assigns it to attribute _ship
-        """
-        self._ship = Ship(x=GAME_WIDTH/2, bottom=SHIP_BOTTOM,
-        height=SHIP_HEIGHT, width=SHIP_WIDTH, source='ship.png')
+        This method creates a new ship and assigns it to attribute _ship
 
-    def createaliens(self):
+        The ship is a HeadlessShip, which only keeps where the ship is, even in
+        a wave that is not headless: _scene draws the ship from the sprite
+        atlas, so a Ship would load its picture and never be drawn.
         """
-        This function creates ALIEN_ROWS rows of Alien objects with
-        ALIENS_IN_ROW Aliens in each row. Each row of aliens is added to
-        self._aliens
-        """
-
-        alienrow = []
-        rowcount = ALIEN_ROWS - 1
-        for x in range(ALIEN_ROWS):
-            rowcount2 = x+rowcount
-            imgcount = int(rowcount2/2)
-            imgremain = imgcount % len(ALIEN_IMAGES)
-
-            for n in range(ALIENS_IN_ROW):
-                p = Alien(left=ALIEN_H_SEP+n*(ALIEN_H_SEP+ALIEN_WIDTH),
-                top=GAME_HEIGHT-ALIEN_CEILING-x*(ALIEN_V_SEP+ALIEN_HEIGHT),
-                source=ALIEN_IMAGES[imgremain], width=ALIEN_WIDTH,
-                height=ALIEN_HEIGHT)
-                alienrow.append(p)
-            rowcount = rowcount - 2
-            self._aliens.append(alienrow)
-            alienrow = []
+        self._ship = HeadlessShip(x=GAME_WIDTH/2, bottom=SHIP_BOTTOM,
+        height=SHIP_HEIGHT, width=SHIP_WIDTH)
+        self._shipx = self._ship.getx()
+        self._dirty.add('ship')
 
     def shipmove(self, input):
         """
@@ -270,24 +513,23 @@ class Wave(object):
         if self._ship is not None:
             if input.is_key_down('left') and self._ship.left > 0:
                 self._ship.setx(self._ship.getx() - SHIP_MOVEMENT)
+                self._dirty.add('ship')
             if input.is_key_down('right') and self._ship.right < GAME_WIDTH:
                 self._ship.setx(self._ship.getx() + SHIP_MOVEMENT)
+                self._dirty.add('ship')
 
     def shipfire(self, input):
         """
-        This function creates a Bolt object originating at the player ships
+        This function adds a bolt originating at the player ships to _bolts,
+        unless there is already a bolt from the ship on screen.
 
         Parameter input: The currect input recived by the PC
         Precondition: input is an instance of GInput
         """
-        isplayerbolt = 0
-        for bolts in self._bolts:
-            isplayerbolt += bolts.getfromship()
-
         if self._ship is not None:
-            if input.is_key_down('spacebar') and isplayerbolt == 0:
-                bolt = Bolt(self._ship.getx(), self._ship.gettop(), True)
-                self._bolts.append(bolt)
+            if input.is_key_down('spacebar') and not self._bolts.hasshipbolt():
+                self._bolts.add(self._ship.getx(), self._ship.gettop(), True)
+                self._dirty.add('bolts')
 
     def alienfire(self):
         """
@@ -296,53 +538,53 @@ class Wave(object):
         First it picks a random nonempty column of aliens and chooses the
         lowest alien in that column. Then it subtracts 1 from self._boltsteps
         everytime the aliens move untill self._boltsteps == 0. At that point
-        a Bolt object is created at the location of the chosen alien and
-        self._boltsteps is assigned a random number between 1 and BOLT_RATE
-        """
-        col = random.randint(0, ALIENS_IN_ROW-1)
-        empty = self._aliens[0][col] == None
-        while empty == True:
-            for x in range(ALIEN_ROWS):
-                empty = empty and self._aliens[x][col] == None
-            col = random.randint(0, ALIENS_IN_ROW-1)
-
-        bottom = GAME_HEIGHT
-        i = 2
-        botalien = self._aliens[ALIEN_ROWS-1][col]
-        while (botalien is None) and (i <= ALIEN_ROWS):
-            try:
-                botalien = self._aliens[ALIEN_ROWS - i][col]
-                i = i + 1
-            except:
-                i = i+1
-
-        for x  in range(0-ALIEN_ROWS):
-            if self._aliens[x][col] is not None:
-                if (self._aliens[x][col].gety()) < bottom:
-                    botalien = self._aliens[x][col]
-
+        a bolt is added to _bolts at the location of the chosen alien and
+        self._boltsteps is assigned a random number between 1 and
+        self._boltrate
+        """
         if self._boltsteps == 0:
-            if botalien is not None:
-                albolt = Bolt(botalien.getx(), (botalien.getbottom()
-                 - BOLT_HEIGHT/2), False)
-                self._bolts.append(albolt)
-                self._boltsteps = random.randint(1, BOLT_RATE)
+            columns = self._formation.columns()
+            if len(columns) > 0:
+                col = columns[self._rng.randint(0, len(columns)-1)]
+                row = self._formation.lowest(col)
+                x, y = self._formation.getposition(row, col)
+                self._bolts.add(x, (y - ALIEN_HEIGHT/2 - BOLT_HEIGHT/2), False)
+                self._dirty.add('bolts')
+                self._boltsteps = self._rng.randint(1, self._boltrate)
 
     def boltmove(self):
         """
-        This function moves Bolt objects aross the screen.
+        This function moves the bolts aross the screen.
+
+        Each time this function is called all current bolt's y coordinates
+        change by their velocity. This function also removes bolts that
+        reach the bottom or top of the screen. All of this is done in one pass
+        by method move from the BoltBuffer class.
+        """
+        self._bolts.move()
 
-        Each time this function is called all current bolt's y attributes
-        changes self._velocity pixels. This function also deletes Bolts that
-        reach the bottom or top of the screen.
+    def alienmarch(self, dt):
         """
-        for bolts in self._bolts:
-            vel = bolts.getVelocity()
-            y = bolts.gety()
-            bolts.sety(y + vel)
-            pos = self._bolts.index(bolts)
-            if bolts.getbottom() > GAME_HEIGHT or bolts.gettop() < 0:
-                del self._bolts[pos]
+        This function increases the _time attribute by dt and steps the aliens
+        when it is time to.
+
+        On frames where the aliens step, it gets the right and left most
+        coordinate of an alien on screen from _formation, and moves the aliens
+        down if they are at an edge of the screen.
+
+        Parameter dt: The time is seconds since last update
+        Precondition: dt is a number int or float
+        """
+        self._time += dt
+
+        if self._time >= self._speed:
+            hileft, hirite = self._formation.extent()[:2]
+            if hirite > GAME_WIDTH - ALIEN_H_SEP:
+                self.alienmovedownatright()
+            elif hileft < ALIEN_H_SEP:
+                self.alienmovedownatleft()
+            else:
+                self.alienmove()
 
     def alienmove(self):
         """
@@ -351,16 +593,12 @@ class Wave(object):
         attribute _time to 0 and reduces attribute _boltsteps by 1.
         """
         if self._aliendir == 0:
-            for row in self._aliens:
-                for alien in row:
-                    if alien is not None:
-                        alien.setx(alien.getx() + ALIEN_H_WALK)
+            self._formation.march(ALIEN_H_WALK, 0)
 
         elif self._aliendir == 1:
-            for row in self._aliens:
-                for alien in row:
-                    if alien is not None:
-                        alien.setx(alien.getx() - ALIEN_H_WALK)
+            self._formation.march(-ALIEN_H_WALK, 0)
+
+        self._dirty.add('formation')
 
         self._time = 0
         self._boltsteps -= 1
@@ -374,14 +612,8 @@ class Wave(object):
         attribute _boltsteps by 1, and switches the direction the aliens move to
         left.
         """
-        for row in self._aliens:
-            for alien in row:
-                if alien is not None:
-                    alien.sety(alien.gety() - ALIEN_V_WALK)
-        for row in self._aliens:
-            for alien in row:
-                if alien is not None:
-                    alien.setx(alien.getx() - ALIEN_H_WALK)
+        self._formation.march(-ALIEN_H_WALK, -ALIEN_V_WALK)
+        self._dirty.add('formation')
         self._time = 0
         self._aliendir = 1
         self._boltsteps -= 1
@@ -395,14 +627,8 @@ class Wave(object):
         attribute _boltsteps by 1, and switches the direction the aliens move to
         right.
         """
-        for row in self._aliens:
-            for alien in row:
-                if alien is not None:
-                    alien.sety(alien.gety() - ALIEN_V_WALK)
-        for row in self._aliens:
-            for alien in row:
-                if alien is not None:
-                    alien.setx(alien.getx() + ALIEN_H_WALK)
+        self._formation.march(ALIEN_H_WALK, -ALIEN_V_WALK)
+        self._dirty.add('formation')
         self._time = 0
         self._aliendir = 0
         self._boltsteps -= 1
@@ -411,50 +637,54 @@ class Wave(object):
         """
         This function tests if any bolts fired have hit an alien. If an alien is
         hit, the alien and bolt are removed and attribute score increases.
-        This function uses method collides from the Alien class to test if any
-        bolts from the player ship have hit an alien.
-
-        """
-        for x in range(len(self._aliens)):
-            for aliens in self._aliens[x]:
-                if aliens is not None:
-                    for bolts in self._bolts:
-                        collide = aliens.collides(bolts)
-                        if collide == True:
-                            xlist = self._aliens[x]
-                            pos = xlist.index(aliens)
-                            self._aliens[x][pos] = None
-                            pos = self._bolts.index(bolts)
-                            del self._bolts[pos]
-                            self._score += 100
+        Each bolt from the player ship is tested against the aliens near it
+        with method hit from the Formation class. A bolt can only destroy
+        one alien.
+
+        """
+        if not self._bolts.hasshipbolt():
+            return
+        xs = self._bolts.getx().tolist()
+        ys = self._bolts.gety().tolist()
+        owners = self._bolts.getfromship().tolist()
+        for i in range(len(xs)):
+            if owners[i]:
+                hit = self._formation.hit(xs[i] - BOLT_WIDTH/2,
+                ys[i] - BOLT_HEIGHT/2, xs[i] + BOLT_WIDTH/2,
+                ys[i] + BOLT_HEIGHT/2)
+                if hit is not None:
+                    row, col = hit
+                    self._formation.kill(row, col)
+                    self._bolts.kill(i)
+                    self._score += 100
+                    self._dirty.add('formation')
+        self._bolts.compact()
 
     def shipcollide(self):
         """
         This function tests if any bolts fired have hit the player ship. If the
         ship is hit, the ship and bolt are removed.
-        This function uses method collides from the Ship class to test if any
-        bolts from the an alien have hit the ship.
+        This function uses method hit from the BoltBuffer class to test the
+        bolts from the aliens against the ship.
 
         """
-        for bolts in self._bolts:
-            if self._ship is not None:
-                collide = self._ship.collides(bolts)
-                if collide == True:
-                    self._ship = None
-                    pos = self._bolts.index(bolts)
-                    del self._bolts[pos]
+        if self._ship is not None:
+            i = self._bolts.hit(self._ship.left, self._ship.bottom,
+            self._ship.right, self._ship.top, False)
+            if i is not None:
+                self._ship = None
+                self._bolts.kill(i)
+                self._bolts.compact()
+                self._dirty.add('ship')
 
     def alienbelowtest(self):
         """
         This method tests if any aliens have gotten below DEFENSE_LINE. If an
         alien has gotten below the defense line attribute _aliensblow is changed
-        to True.
+        to True. The bottom edge comes from the cached edges in _formation.
         """
-        for rows in self._aliens:
-            for aliens in rows:
-                if aliens is not None:
-                    if aliens.getbottom() <= DEFENSE_LINE:
-                        self._aliensbelow = True
+        if self._formation.below(DEFENSE_LINE):
+            self._aliensbelow = True
 
     def alientracker(self):
         """
@@ -462,16 +692,15 @@ class Wave(object):
         shot. It also decreases attribute ._speed depending on how many aliens
         have been shot. Finally, if no aliens are left this function updates
         attribute _aliensleft to False
+
+        The number of aliens left is counted by _formation as aliens are shot,
+        so this function does not need to look at the grid.
         """
-        aliensleft = ALIEN_ROWS*ALIENS_IN_ROW
-        alienskilled = 0
-        for rows in self._aliens:
-            for aliens in rows:
-                if aliens is None:
-                    aliensleft -= 1
-                    alienskilled += 1
+        aliensleft = self._formation.count()
+        alienskilled = (self._formation.getrows()*self._formation.getcols()
+        - aliensleft)
 
-        self._speed = ALIEN_SPEED*(0.97**alienskilled)
+        self._speed = self._alienspeed*(self._speedcurve**alienskilled)
 
         if aliensleft == 0:
             self._aliensleft = False